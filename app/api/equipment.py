@@ -1,24 +1,77 @@
 # app/api/equipment.py
 from __future__ import annotations
 
+import asyncio
+import base64
 import contextlib
+import functools
+import json
+import uuid
+from datetime import date, datetime
 from typing import TypedDict
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from psycopg.errors import (  # type: ignore
     CheckViolation,
     ForeignKeyViolation,
     NotNullViolation,
     UniqueViolation,
 )
-from sqlalchemy import Date, case, cast, func, literal, literal_column, or_, select
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import (
+    Date,
+    Integer,
+    and_,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import visitors
 
-from ..deps.db import get_db
-from ..models.equipment import Equipment
+from ..audit import AUDIT_FIELDS, audit, audit_entry, audit_select
+from ..cache import (
+    CachedResponse,
+    count_cache,
+    detail_cache,
+    invalidate_equipment,
+    list_cache,
+    make_etag,
+    stats_cache,
+)
+from ..config import settings
+from ..db import SessionLocal
+from ..deps.db import get_db, get_local_db, get_read_db
+from ..mirror import local_read_session, queue_when_offline
+from ..models.audit import EquipmentAudit
+from ..models.equipment import ALLOWED_STATES, Equipment
+from ..models.equipment_archive import EquipmentArchive
 from ..models.verification import Verification
-from ..schemas.equipment import EquipmentCreate, EquipmentRead, EquipmentUpdate
+from ..models.verification_history import VerificationHistory
+from ..replica import is_replica, may_miss_recent_write
+from ..schemas.equipment import (
+    BATCH_MAX_ITEMS,
+    EquipmentAuditRead,
+    EquipmentBatchGet,
+    EquipmentBatchUpdate,
+    EquipmentCreate,
+    EquipmentRead,
+    EquipmentStats,
+    EquipmentTypeStats,
+    EquipmentUpdate,
+)
+from ..schemas.verification import VerificationHistoryRead
+from ..sqlcompat import days_until, today, uuid_text
 
 router = APIRouter(prefix="/equipment", tags=["equipment"])
 
@@ -32,8 +85,19 @@ class EquipmentQuery(TypedDict, total=False):
     equipment_type: str  # query alias: "type"
     serial_number: str
     inventory_number: str
+    status: str
+    state: str
+    due_before: date  # next_verification_date <= due_before
+    due_after: date  # next_verification_date >= due_after
+    updated_since: datetime  # updated_at >= updated_since (инкрементальная синхронизация)
+    include_archived: bool  # вместе со списанным оборудованием (equipment_archive)
+    sort: str  # one of SORT_FIELDS
     limit: int
     offset: int
+    cursor: tuple[str, uuid.UUID]  # (name, id) последней строки предыдущей страницы
+
+
+SORT_FIELDS = ("name", "next_verification_date", "status")
 
 
 def _to_int(
@@ -54,15 +118,61 @@ def _to_int(
     return v
 
 
+def _to_date(value: str, field: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}: expected YYYY-MM-DD") from e
+
+
+def _to_datetime(value: str, field: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}: expected ISO 8601") from e
+
+
+def _to_choice(value: str, choices: tuple[str, ...], field: str) -> str:
+    if value not in choices:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}: {value!r}")
+    return value
+
+
+def _to_bool(value: str, field: str) -> bool:
+    return _to_choice(value.lower(), ("true", "false", "1", "0"), field) in ("true", "1")
+
+
+def encode_cursor(name: str, equipment_id: str) -> str:
+    """Opaque keyset cursor: urlsafe base64 of JSON [name, id]."""
+    raw = json.dumps([name, equipment_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[str, uuid.UUID]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        name, equipment_id = json.loads(base64.urlsafe_b64decode(padded).decode("utf-8"))
+        if not isinstance(name, str) or not isinstance(equipment_id, str):
+            raise ValueError("cursor must be [name, id]")
+        return name, uuid.UUID(equipment_id)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
 async def get_equipment_query(
     request: Request,
     q: str | None = Query(None, description="Search by name/type/serial/inventory"),
     limit: int | None = Query(50, ge=1, le=200),
     offset: int | None = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Keyset cursor from X-Next-Cursor"),
 ) -> EquipmentQuery:
     """
     Collect query params without growing function signature (keeps linters happy).
-    Extra filters are read from query string: name, type, serial_number, inventory_number.
+    Extra filters are read from query string: name, type, serial_number, inventory_number,
+    status, state, due_before, due_after (inclusive, YYYY-MM-DD), updated_since
+    (ISO 8601 timestamp, inclusive), sort and include_archived (true: also
+    written-off equipment from equipment_archive).
+    If `cursor` is given, it takes precedence over `offset` (keyset pagination).
     """
     qp = request.query_params
     params: EquipmentQuery = {}
@@ -70,49 +180,83 @@ async def get_equipment_query(
     if q:
         params["q"] = q
 
-    name = qp.get("name")
-    if name:
-        params["name"] = name
+    # точные текстовые фильтры: query-параметр -> ключ EquipmentQuery
+    for arg, key in (
+        ("name", "name"),
+        ("type", "equipment_type"),
+        ("serial_number", "serial_number"),
+        ("inventory_number", "inventory_number"),
+    ):
+        value = qp.get(arg)
+        if value:
+            params[key] = value
+
+    status_value = qp.get("status")
+    if status_value:
+        params["status"] = _to_choice(status_value, STATUSES, "status")
+
+    state = qp.get("state")
+    if state:
+        params["state"] = _to_choice(state, ALLOWED_STATES, "state")
+
+    due_before = qp.get("due_before")
+    if due_before:
+        params["due_before"] = _to_date(due_before, "due_before")
 
-    equipment_type = qp.get("type")
-    if equipment_type:
-        params["equipment_type"] = equipment_type
+    due_after = qp.get("due_after")
+    if due_after:
+        params["due_after"] = _to_date(due_after, "due_after")
 
-    serial_number = qp.get("serial_number")
-    if serial_number:
-        params["serial_number"] = serial_number
+    updated_since = qp.get("updated_since")
+    if updated_since:
+        params["updated_since"] = _to_datetime(updated_since, "updated_since")
 
-    inventory_number = qp.get("inventory_number")
-    if inventory_number:
-        params["inventory_number"] = inventory_number
+    sort = qp.get("sort")
+    if sort:
+        params["sort"] = _to_choice(sort, SORT_FIELDS, "sort")
+
+    include_archived = qp.get("include_archived")
+    if include_archived and _to_bool(include_archived, "include_archived"):
+        params["include_archived"] = True
 
     params["limit"] = _to_int(str(limit) if limit is not None else None, 50, 1, 200)
     params["offset"] = _to_int(str(offset) if offset is not None else None, 0, 0, None)
+    if cursor:
+        if params.get("sort", "name") != "name":
+            raise HTTPException(status_code=400, detail="cursor is supported only for sort=name")
+        params["cursor"] = decode_cursor(cursor)
     return params
 
 
+# параметры, не влияющие на набор строк (только на страницу/порядок)
+PAGING_PARAMS = ("limit", "offset", "cursor", "sort")
+
+
+def query_cache_key(params: EquipmentQuery, *, paging: bool = False) -> tuple:
+    """
+    Hashable, order-independent key of the query. Includes today's date:
+    status depends on CURRENT_DATE, so cached results expire at midnight.
+    """
+    items = sorted((k, str(v)) for k, v in params.items() if paging or k not in PAGING_PARAMS)
+    return (date.today().isoformat(), *items)
+
+
 # -----------------------------
 # Derived columns (verification/status)
 # -----------------------------
-NEXT_DATE_EXPR = cast(
-    (
-        Verification.verification_date
-        + func.make_interval(  # years=0, months=interval_months
-            literal(0),
-            Verification.interval_months,
-        )
-        - literal_column("interval '1 day'")
-    ),
-    Date,
-).label("next_verification_date")
+# хранимая generated-колонка verification.next_verification_date (индексирована)
+NEXT_DATE_EXPR = Verification.next_verification_date.label("next_verification_date")
 
-# разница в днях: next_date - CURRENT_DATE (в PostgreSQL это integer для date - date)
-DAYS_LEFT = (NEXT_DATE_EXPR - func.current_date()).label("days_left")
+# разница в днях: next_date - CURRENT_DATE (в SQLite-зеркале — по локальной дате)
+DAYS_LEFT = days_until(Verification.next_verification_date).label("days_left")
 
 # статусы для нерабочих состояний
 NON_WORK_STATES = ("на консервации", "на верификации", "в ремонте", "списано")
 
-DAYS_THRESHOLD = 14  # количество дней для статуса "срок истекает"
+DAYS_THRESHOLD = settings.days_threshold  # количество дней для статуса "срок истекает"
+
+# все значения, которые может вернуть STATUS_EXPR
+STATUSES = ("годен", "срок истекает", "срок истек", "нет данных", *NON_WORK_STATES)
 
 STATUS_EXPR = case(
     (Equipment.state.in_(NON_WORK_STATES), Equipment.state),
@@ -130,39 +274,177 @@ STATUS_EXPR = case(
     ),
 ).label("status")
 
+# плоская проекция строки EquipmentRead: только колонки, без ORM-сущности
+EQUIPMENT_COLUMNS = (
+    uuid_text(Equipment.id).label("id"),
+    Equipment.name,
+    Equipment.type,
+    Equipment.serial_number,
+    Equipment.inventory_number,
+    Equipment.created_at,
+    Equipment.updated_at,
+    Verification.verification_date,
+    Verification.interval_months,
+    NEXT_DATE_EXPR,
+    Equipment.state,
+    STATUS_EXPR,
+)
+
+
+# FROM equipment LEFT JOIN verification. Core-join, а не ORM .join(): with_archive()
+# подменяет в готовом запросе обе таблицы
+EQUIPMENT_FROM = Equipment.__table__.outerjoin(
+    Verification.__table__, Verification.equipment_id == Equipment.id
+)
+
+
+@functools.cache
+def equipment_select():
+    """
+    SELECT EQUIPMENT_COLUMNS FROM equipment LEFT JOIN verification.
+    Built once: statements are immutable, .where()/.order_by() return copies.
+    """
+    return select(*EQUIPMENT_COLUMNS).select_from(EQUIPMENT_FROM)
+
 
 # -----------------------------
-# Handlers
+# Archive (include_archived)
 # -----------------------------
-@router.get("/", response_model=list[EquipmentRead])
-def list_equipment(
-    params: EquipmentQuery = Depends(get_equipment_query),  # noqa: B008
-    db: Session = Depends(get_db),  # noqa: B008
-):
+_EQUIPMENT = Equipment.__table__
+_VERIFICATION = Verification.__table__
+_ARCHIVE = EquipmentArchive.__table__
+_ARCHIVE_EQUIPMENT_COLUMNS = (
+    "id",
+    "name",
+    "type",
+    "serial_number",
+    "inventory_number",
+    "state",
+    "created_at",
+    "updated_at",
+)
+_ARCHIVE_VERIFICATION_COLUMNS = ("verification_date", "interval_months", "next_verification_date")
+
+# equipment ∪ equipment_archive и verification ∪ последняя поверка из архива — под
+# именами исходных таблиц; условия на колонки PostgreSQL проталкивает в обе ветки
+EQUIPMENT_ALL = union_all(
+    select(*(_EQUIPMENT.c[c] for c in _ARCHIVE_EQUIPMENT_COLUMNS)),
+    select(*(_ARCHIVE.c[c] for c in _ARCHIVE_EQUIPMENT_COLUMNS)),
+).subquery("equipment")
+VERIFICATION_ALL = union_all(
+    select(
+        _VERIFICATION.c.equipment_id,
+        *(_VERIFICATION.c[c] for c in _ARCHIVE_VERIFICATION_COLUMNS),
+    ),
+    select(_ARCHIVE.c.id, *(_ARCHIVE.c[c] for c in _ARCHIVE_VERIFICATION_COLUMNS)).where(
+        _ARCHIVE.c.verification_date.is_not(None)
+    ),
+).subquery("verification")
+
+
+def _archive_replacement(element, **kw):
+    if element is _EQUIPMENT:
+        return EQUIPMENT_ALL
+    if element is _VERIFICATION:
+        return VERIFICATION_ALL
+    table = getattr(element, "table", None)
+    if table is _EQUIPMENT:
+        return EQUIPMENT_ALL.c[element.key]
+    if table is _VERIFICATION:
+        return VERIFICATION_ALL.c[element.key]
+    return None
+
+
+def with_archive(stmt):
     """
-    Equipment list (read-only) with filters & pagination.
-    Response includes verification_date, interval_months, next_verification_date.
+    `stmt` over equipment/verification (FROM EQUIPMENT_FROM) rewritten to cover
+    equipment_archive as well: filters, STATUS_EXPR and ordering stay shared.
+    """
+    return visitors.replacement_traverse(stmt, {}, _archive_replacement)
+
+
+async def restore_archived(db: AsyncSession, where) -> list[uuid.UUID]:
+    """
+    Move written-off rows matching `where` (on EquipmentArchive) back into
+    equipment + verification, in the caller's transaction; returns their ids.
+
+    The rows come back with state "списано" and updated_at = now(): a write that
+    changes the state keeps them in the hot set, otherwise the deferred trigger
+    archives them again at commit. The change feed sees an 'insert'.
+    """
+    rows = (await db.execute(delete(_ARCHIVE).where(where).returning(*_ARCHIVE.c))).all()
+    if not rows:
+        return []
+    await db.execute(
+        _EQUIPMENT.insert().values(updated_at=func.now()),
+        [
+            {c: row._mapping[c] for c in _ARCHIVE_EQUIPMENT_COLUMNS if c != "updated_at"}
+            for row in rows
+        ],
+    )
+    verifications = [
+        {
+            "equipment_id": str(row.id),
+            "verification_date": row.verification_date,
+            "interval_months": row.interval_months,
+        }
+        for row in rows
+        if row.verification_date is not None and row.interval_months is not None
+    ]
+    if verifications:
+        await db.execute(insert(Verification), verifications)
+    return [row.id for row in rows]
+
+
+# -----------------------------
+# Filters (shared by list/export/...)
+# -----------------------------
+# колонки поиска `q`; у каждой GIN-индекс gin_trgm_ops (pg_trgm), поэтому
+# ILIKE '%...%' идёт через Bitmap Index Scan, а не через seq scan
+SEARCH_COLUMNS = (
+    Equipment.name,
+    Equipment.type,
+    Equipment.serial_number,
+    Equipment.inventory_number,
+)
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so `q` is matched literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_clause(q: str):
+    like = f"%{_escape_like(q)}%"
+    return or_(*(col.ilike(like, escape="\\") for col in SEARCH_COLUMNS))
+
+
+def status_clause(status_value: str):
     """
-    stmt = select(
-        Equipment,
-        Verification.verification_date,
-        Verification.interval_months,
-        NEXT_DATE_EXPR,
-        Equipment.state,
-        STATUS_EXPR,
-    ).join(Verification, Verification.equipment_id == Equipment.id, isouter=True)
+    WHERE-эквивалент `STATUS_EXPR == status_value`, записанный через state и
+    next_verification_date, чтобы планировщик мог использовать индексы
+    (ix_equipment_state, ix_equipment_in_work_name_id, ix_verification_next_verification_date).
+    """
+    if status_value in NON_WORK_STATES:
+        return Equipment.state == status_value
+
+    in_work = Equipment.state == "в работе"
+    next_date = Verification.next_verification_date
+    if status_value == "срок истек":
+        return and_(in_work, next_date < today())
+    if status_value == "срок истекает":
+        return and_(in_work, next_date >= today(), next_date <= today(DAYS_THRESHOLD))
+    if status_value == "годен":
+        return and_(in_work, next_date > today(DAYS_THRESHOLD))
+    # "нет данных": в работе, но верификации нет
+    return and_(in_work, next_date.is_(None))
 
+
+def apply_filters(stmt, params: EquipmentQuery):
+    """Apply search and exact filters from EquipmentQuery (no ordering/paging)."""
     # Full-text-like search across several columns
     if "q" in params:
-        like = f"%{params['q']}%"
-        stmt = stmt.where(
-            or_(
-                Equipment.name.ilike(like),
-                Equipment.type.ilike(like),
-                Equipment.serial_number.ilike(like),
-                Equipment.inventory_number.ilike(like),
-            )
-        )
+        stmt = stmt.where(search_clause(params["q"]))
 
     # Exact filters (if provided)
     if "name" in params:
@@ -174,79 +456,585 @@ def list_equipment(
     if "inventory_number" in params:
         stmt = stmt.where(Equipment.inventory_number == params["inventory_number"])
 
-    stmt = stmt.order_by(Equipment.name).offset(params["offset"]).limit(params["limit"])
-
-    rows = db.execute(stmt).all()
-
-    # Flatten JOIN into plain dicts that match EquipmentRead
-    result: list[dict] = []
-    for eq, ver_date, interval_months, next_date, state, status_value in rows:
-        result.append(
-            {
-                "id": str(eq.id),
-                "name": eq.name,
-                "type": eq.type,
-                "serial_number": eq.serial_number,
-                "inventory_number": eq.inventory_number,
-                "created_at": eq.created_at,
-                "updated_at": eq.updated_at,
-                "verification_date": ver_date,
-                "interval_months": interval_months,
-                "next_verification_date": next_date,
-                "state": state,
-                "status": status_value,
-            }
+    # Status / due-date filters
+    if "status" in params:
+        stmt = stmt.where(status_clause(params["status"]))
+    if "state" in params:
+        stmt = stmt.where(Equipment.state == params["state"])
+    if "due_before" in params:
+        stmt = stmt.where(Verification.next_verification_date <= params["due_before"])
+    if "due_after" in params:
+        stmt = stmt.where(Verification.next_verification_date >= params["due_after"])
+
+    # Delta sync: updated_at поддерживают триггеры БД (в т.ч. при правке verification)
+    if "updated_since" in params:
+        stmt = stmt.where(Equipment.updated_at >= params["updated_since"])
+    return stmt
+
+
+def apply_order(stmt, params: EquipmentQuery):
+    """ORDER BY by `sort`; (name, id) is always the tie-breaker so pages are stable."""
+    sort = params.get("sort", "name")
+    if sort == "next_verification_date":
+        stmt = stmt.order_by(Verification.next_verification_date.asc().nulls_last())
+    elif sort == "status":
+        stmt = stmt.order_by(STATUS_EXPR)
+    # (name, id) — детерминированный порядок, обслуживается ix_equipment_name_id
+    return stmt.order_by(Equipment.name, Equipment.id)
+
+
+def integrity_detail(e: IntegrityError) -> str:
+    """Читаемая диагностика IntegrityError без длинных строк."""
+    orig = getattr(e, "orig", None)
+    msg = "Integrity error"
+
+    def _diag_attr(name: str):
+        diag = getattr(orig, "diag", None)
+        return getattr(diag, name, None) if diag is not None else None
+
+    if isinstance(orig, UniqueViolation):
+        msg = f"Unique violation (constraint={_diag_attr('constraint_name')})"
+    elif isinstance(orig, CheckViolation):
+        msg = f"Check violation (constraint={_diag_attr('constraint_name')})"
+    elif isinstance(orig, NotNullViolation):
+        msg = f"Not null violation (column={_diag_attr('column_name')})"
+    elif isinstance(orig, ForeignKeyViolation):
+        msg = f"Foreign key violation (constraint={_diag_attr('constraint_name')})"
+    else:
+        with contextlib.suppress(Exception):
+            msg = str(orig)
+    return msg
+
+
+# -----------------------------
+# Prebuilt statements
+# -----------------------------
+# Самые частые формы запросов собраны один раз при импорте: cache key у объекта
+# мемоизирован, и execute() сразу берёт SQL из кэша компиляции, без пересборки
+# select(...) с NEXT_DATE_EXPR/STATUS_EXPR на каждый запрос.
+DETAIL_STMT = equipment_select().where(Equipment.id == bindparam("equipment_id")).limit(1)
+# карточка списанного прибора (только при промахе по DETAIL_STMT)
+DETAIL_ALL_STMT = with_archive(DETAIL_STMT)
+
+# список без фильтров, sort=name: OFFSET-страница и keyset-страница
+LIST_PAGE_STMT = (
+    apply_order(equipment_select(), {})
+    .offset(bindparam("offset", type_=Integer))
+    .limit(bindparam("limit", type_=Integer))
+)
+LIST_KEYSET_STMT = (
+    apply_order(equipment_select(), {})
+    .where(
+        tuple_(Equipment.name, Equipment.id)
+        > tuple_(
+            bindparam("cursor_name", type_=Equipment.name.type),
+            bindparam("cursor_id", type_=Equipment.id.type),
+        )
+    )
+    .limit(bindparam("limit", type_=Integer))
+)
+
+
+def page_statement(params: EquipmentQuery):
+    """(statement, bind params) for one page of GET /equipment."""
+    if params.keys() <= set(PAGING_PARAMS) and params.get("sort", "name") == "name":
+        if "cursor" in params:
+            cursor_name, cursor_id = params["cursor"]
+            binds = {"cursor_name": cursor_name, "cursor_id": cursor_id}
+            return LIST_KEYSET_STMT, {**binds, "limit": params["limit"]}
+        return LIST_PAGE_STMT, {"offset": params["offset"], "limit": params["limit"]}
+
+    stmt = apply_order(apply_filters(equipment_select(), params), params)
+    if "cursor" in params:
+        # keyset: row-comparison (name, id) > (:name, :id) — без O(offset)
+        stmt = stmt.where(tuple_(Equipment.name, Equipment.id) > params["cursor"])
+    else:
+        stmt = stmt.offset(params["offset"])
+    stmt = stmt.limit(params["limit"])
+    if params.get("include_archived"):
+        stmt = with_archive(stmt)
+    return stmt, {}
+
+
+async def prime_statements(db: AsyncSession) -> None:
+    """Warm-up: run the prebuilt statements once (SQL compile cache, psycopg/PG caches)."""
+    nil_id = uuid.UUID(int=0)
+    await db.execute(DETAIL_STMT, {"equipment_id": str(nil_id)})
+    await db.execute(LIST_PAGE_STMT, {"offset": 0, "limit": 0})
+    await db.execute(LIST_KEYSET_STMT, {"cursor_name": "", "cursor_id": nil_id, "limit": 0})
+
+
+# -----------------------------
+# Total count (X-Total-Count)
+# -----------------------------
+COUNT_MODES = ("none", "exact", "estimated")
+
+
+def has_filters(params: EquipmentQuery) -> bool:
+    return not params.keys() <= set(PAGING_PARAMS)
+
+
+def rows_statement(params: EquipmentQuery):
+    """Rows matched by the filters of `params` (no order/paging), for COUNT and EXPLAIN."""
+    # LEFT JOIN verification (1:1, equipment_id уникален) PostgreSQL выбрасывает из плана,
+    # если фильтры не трогают её колонки
+    stmt = apply_filters(select(Equipment.id).select_from(EQUIPMENT_FROM), params)
+    return with_archive(stmt) if params.get("include_archived") else stmt
+
+
+async def estimate_rows(db: AsyncSession, params: EquipmentQuery) -> int | None:
+    """Planner estimate: pg_class.reltuples without filters, EXPLAIN row estimate with them."""
+    conn = await db.connection()
+    if conn.dialect.name != "postgresql":
+        return None  # локальное зеркало (SQLite): точный COUNT и так дешёвый
+    if not has_filters(params):
+        # статистика ANALYZE/autovacuum; -1 — таблица ещё не анализировалась
+        reltuples = await db.scalar(
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": Equipment.__tablename__},
         )
+        return round(reltuples) if reltuples is not None and reltuples >= 0 else None
+
+    compiled = rows_statement(params).compile(dialect=conn.dialect)
+    result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+    plan = result.scalar_one()
+    return round(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(db: AsyncSession, params: EquipmentQuery, mode: str) -> tuple[int, str]:
+    """
+    (total, mode used). An estimate below `count_estimate_threshold` is replaced
+    by an exact count: small results are cheap to count and estimates of
+    selective filters are the least reliable.
+    """
+    if mode == "estimated":
+        estimate = await estimate_rows(db, params)
+        if estimate is not None and estimate >= settings.count_estimate_threshold:
+            return estimate, "estimated"
+    total = await db.scalar(select(func.count()).select_from(rows_statement(params).subquery()))
+    return total, "exact"
+
+
+async def total_count(params: EquipmentQuery, mode: str) -> tuple[int, str]:
+    """count_rows() memoized per normalized filter; runs in its own session."""
+    key = (mode, *query_cache_key(params))
+    cached = await count_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = await count_cache.generation()
+
+    # своя сессия: COUNT идёт параллельно с запросом страницы
+    async with local_read_session() as db:
+        result = await count_rows(db, params, mode)
+        if not await may_miss_recent_write(db, count_cache):
+            await count_cache.set(key, result, generation)
     return result
 
 
+async def fetch_page(db: AsyncSession, params: EquipmentQuery):
+    stmt, binds = page_statement(params)
+    return (await db.execute(stmt, binds)).all()
+
+
+# -----------------------------
+# Handlers
+# -----------------------------
+# Сериализация: Row -> EquipmentRead -> JSON bytes за один проход pydantic-core,
+# без ORM identity map и промежуточных dict; FastAPI повторно ответ не валидирует.
+EQUIPMENT_ADAPTER = TypeAdapter(EquipmentRead)
+EQUIPMENT_LIST_ADAPTER = TypeAdapter(list[EquipmentRead])
+
+
+def dump_equipment(adapter: TypeAdapter, data) -> bytes:
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def equipment_response(
+    adapter: TypeAdapter,
+    data,
+    status_code: int = status.HTTP_200_OK,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    body = dump_equipment(adapter, data)
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+# -----------------------------
+# Conditional GET (ETag / If-None-Match)
+# -----------------------------
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" matches "x"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def cached_response(
+    request: Request, entry: CachedResponse, extra_headers: dict[str, str] | None = None
+) -> Response:
+    # no-cache: клиент может хранить ответ, но каждый раз перепроверяет его по ETag
+    headers = {**entry.headers, **(extra_headers or {}), "ETag": entry.etag}
+    headers["Cache-Control"] = "no-cache"
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(entry.body, headers=headers, media_type="application/json")
+
+
+def make_cached(body: bytes, headers: dict[str, str] | None = None) -> CachedResponse:
+    return CachedResponse(make_etag(body), body, headers or {}, date.today().isoformat())
+
+
+async def fetch_equipment_row(db: AsyncSession, equipment_id: str):
+    binds = {"equipment_id": equipment_id}
+    row = (await db.execute(DETAIL_STMT, binds)).first()
+    if row is None:
+        # state = "списано": триггер перенёс строку в архив при COMMIT
+        row = (await db.execute(DETAIL_ALL_STMT, binds)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    return row
+
+
+EQUIPMENT_UPDATE_FIELDS = {"name", "type", "serial_number", "inventory_number", "state"}
+
+# UPDATE verification по equipment_id (executemany); не заданное поле (NULL) не меняется
+_VERIFICATION_UPDATE = (
+    update(Verification.__table__)
+    .where(Verification.__table__.c.equipment_id == bindparam("b_equipment_id"))
+    .values(
+        verification_date=func.coalesce(
+            bindparam("b_verification_date", type_=Date),
+            Verification.__table__.c.verification_date,
+        ),
+        interval_months=func.coalesce(
+            bindparam("b_interval_months", type_=Integer),
+            Verification.__table__.c.interval_months,
+        ),
+    )
+)
+
+
+async def apply_equipment_updates(
+    db: AsyncSession, items: list[EquipmentBatchUpdate], actor: str | None = None
+) -> list[dict | None]:
+    """
+    Partial updates for many instruments, set-based (no commit):
+    one locked SELECT of the current rows (existence, presence of verification,
+    audit "before"), one bulk UPDATE of equipment by PK, then executemany
+    UPDATE / multi-row INSERT of verification. Written-off ids are restored from
+    equipment_archive first (see restore_archived()).
+    `None` in a field means "leave as is" (as in EquipmentUpdate).
+    Returns audit entries, to be recorded after commit.
+    """
+    ids = [item.id for item in items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Duplicate id in batch")
+
+    # проверка существования заодно даёт "было" для аудита; FOR UPDATE — чтобы
+    # параллельная правка не вклинилась между чтением и UPDATE
+    stmt = audit_select().where(Equipment.id.in_(ids)).with_for_update(of=Equipment)
+    before = {row.id: row._mapping for row in (await db.execute(stmt)).all()}
+    missing = [i for i in ids if i not in before]
+    if missing and await restore_archived(db, EquipmentArchive.id.in_(missing)):
+        # списанные строки вернулись из архива — правятся как обычные
+        stmt = audit_select().where(Equipment.id.in_(missing)).with_for_update(of=Equipment)
+        before.update((row.id, row._mapping) for row in (await db.execute(stmt)).all())
+        missing = [i for i in missing if i not in before]
+    if missing:
+        detail = "Equipment not found"
+        if len(items) > 1:
+            detail += f": {', '.join(map(str, missing))}"
+        raise HTTPException(status_code=404, detail=detail)
+
+    # equipment: ORM bulk UPDATE по первичному ключу (группируется по набору полей)
+    equipment_rows = []
+    for item in items:
+        fields = item.model_dump(include=EQUIPMENT_UPDATE_FIELDS, exclude_none=True)
+        if fields:
+            equipment_rows.append({"id": item.id, **fields})
+    if equipment_rows:
+        await db.execute(update(Equipment), equipment_rows)
+
+    # verification (создадим/обновим, если пришли поля)
+    ver_items = [
+        item
+        for item in items
+        if item.verification_date is not None or item.interval_months is not None
+    ]
+
+    entries = []
+    for item in items:
+        after = {**before[item.id], **item.model_dump(include=set(AUDIT_FIELDS), exclude_none=True)}
+        if item.interval_months is None and before[item.id]["verification_date"] is None:
+            after["interval_months"] = 0 if item.verification_date is not None else None
+        entries.append(audit_entry(item.id, "update", before[item.id], after, actor))
+    if not ver_items:
+        return entries
+
+    # verification есть у строки <=> verification_date в "было" не NULL (NOT NULL в таблице)
+    to_update = [item for item in ver_items if before[item.id]["verification_date"] is not None]
+    to_insert = [item for item in ver_items if before[item.id]["verification_date"] is None]
+
+    if to_update:
+        await db.execute(
+            _VERIFICATION_UPDATE,
+            [
+                {
+                    "b_equipment_id": str(item.id),
+                    "b_verification_date": item.verification_date,
+                    "b_interval_months": item.interval_months,
+                }
+                for item in to_update
+            ],
+        )
+    if to_insert:
+        await db.execute(
+            insert(Verification),
+            [
+                {
+                    "equipment_id": str(item.id),
+                    "verification_date": item.verification_date,
+                    "interval_months": item.interval_months or 0,
+                }
+                for item in to_insert
+            ],
+        )
+    return entries
+
+
+@router.get("/", response_model=list[EquipmentRead])
+async def list_equipment(
+    request: Request,
+    params: EquipmentQuery = Depends(get_equipment_query),  # noqa: B008
+    db: AsyncSession = Depends(get_local_db),  # noqa: B008
+    count: str = Query("none", description="X-Total-Count: none | exact | estimated"),
+):
+    """
+    Equipment list (read-only) with filters & pagination.
+    Response includes verification_date, interval_months, next_verification_date.
+
+    Filters: q, name, type, serial_number, inventory_number, status, state,
+    due_before/due_after, updated_since (delta sync, with GET /equipment/deleted);
+    sorting: sort=name|next_verification_date|status. Written-off equipment
+    ("списано") lives in equipment_archive and is listed only with include_archived=true.
+
+    Pagination: OFFSET (`offset`) or keyset (`cursor`, sort=name only). For a full
+    page the cursor of the next page is returned in the `X-Next-Cursor` header.
+
+    `count=exact|estimated` adds the number of matching rows in `X-Total-Count`
+    (`X-Total-Count-Mode` tells which one was used); counts are memoized per
+    filter until the next write.
+
+    Responses carry a strong `ETag`; `If-None-Match` with the current tag gives 304.
+    Bodies are cached per normalized query until the next write.
+    """
+    count = _to_choice(count, COUNT_MODES, "count")
+    total = None
+
+    key = query_cache_key(params, paging=True)
+    entry = await list_cache.get(key)
+    if entry is None:
+        generation = await list_cache.generation()
+        if count == "none":
+            rows = await fetch_page(db, params)
+        else:
+            rows, total = await asyncio.gather(fetch_page(db, params), total_count(params, count))
+
+        headers = {}
+        if len(rows) == params["limit"] and params.get("sort", "name") == "name":
+            headers["X-Next-Cursor"] = encode_cursor(rows[-1].name, rows[-1].id)
+
+        entry = make_cached(dump_equipment(EQUIPMENT_LIST_ADAPTER, rows), headers)
+        if not await may_miss_recent_write(db, list_cache):
+            await list_cache.set(key, entry, generation)
+
+    if count == "none":
+        return cached_response(request, entry)
+    value, mode = total or await total_count(params, count)
+    return cached_response(
+        request, entry, {"X-Total-Count": str(value), "X-Total-Count-Mode": mode}
+    )
+
+
 # Duplicate without trailing slash to avoid 307 in some WebViews.
 @router.get("", response_model=list[EquipmentRead], include_in_schema=False)
-def list_equipment_no_slash(
+async def list_equipment_no_slash(
+    request: Request,
     params: EquipmentQuery = Depends(get_equipment_query),  # noqa: B008
-    db: Session = Depends(get_db),  # noqa: B008
+    db: AsyncSession = Depends(get_local_db),  # noqa: B008
+    count: str = Query("none"),
 ):
-    return list_equipment(params, db)
+    return await list_equipment(request, params, db, count)
 
 
-@router.get("/{equipment_id}", response_model=EquipmentRead)
-def get_equipment(equipment_id: str, db: Session = Depends(get_db)):  # noqa: B008
+@router.post("/batch-get", response_model=list[EquipmentRead])
+async def batch_get_equipment(
+    payload: EquipmentBatchGet,
+    db: AsyncSession = Depends(get_local_db),  # noqa: B008
+):
+    """
+    Rows for the given ids in one query (ordered by name; unknown ids are skipped).
+    Written-off equipment is looked up in the archive only if some ids are missing.
+    """
     stmt = (
-        select(
-            Equipment,
-            Verification.verification_date,
-            Verification.interval_months,
-            NEXT_DATE_EXPR,
-            Equipment.state,
-            STATUS_EXPR,
-        )
-        .join(Verification, Verification.equipment_id == Equipment.id, isouter=True)
-        .where(Equipment.id == equipment_id)
-        .limit(1)
+        equipment_select()
+        .where(Equipment.id.in_(payload.ids))
+        .order_by(Equipment.name, Equipment.id)
     )
-    row = db.execute(stmt).first()
-    if not row:
+    rows = (await db.execute(stmt)).all()
+    if len(rows) < len(set(payload.ids)):
+        rows = (await db.execute(with_archive(stmt))).all()
+    return equipment_response(EQUIPMENT_LIST_ADAPTER, rows)
+
+
+@router.patch("/batch", response_model=list[EquipmentRead])
+@queue_when_offline
+async def batch_update_equipment(
+    payload: list[EquipmentBatchUpdate],
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+    actor: str | None = Header(
+        None, alias="X-User", max_length=100, description="Who makes the change (audit)"
+    ),
+):
+    """
+    Apply many partial updates in one transaction (all or nothing) and return
+    the refreshed rows from a single SELECT.
+    """
+    if not payload:
+        return equipment_response(EQUIPMENT_LIST_ADAPTER, [])
+    if len(payload) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+
+    try:
+        entries = await apply_equipment_updates(db, payload, actor)
+        await db.commit()
+        await invalidate_equipment([item.id for item in payload])
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=integrity_detail(e)) from e
+    await audit.record(entries)
+
+    stmt = (
+        equipment_select()
+        .where(Equipment.id.in_([item.id for item in payload]))
+        .order_by(Equipment.name, Equipment.id)
+    )
+    rows = (await db.execute(stmt)).all()
+    if len(rows) < len(payload):
+        # часть строк списана этим же запросом и уже в архиве
+        rows = (await db.execute(with_archive(stmt))).all()
+    return equipment_response(EQUIPMENT_LIST_ADAPTER, rows)
+
+
+@router.get("/stats", response_model=EquipmentStats)
+async def equipment_stats(
+    params: EquipmentQuery = Depends(get_equipment_query),  # noqa: B008
+    db: AsyncSession = Depends(get_local_db),  # noqa: B008
+):
+    """
+    Counts by status and by type/status for the same filters as GET /equipment,
+    computed in one GROUP BY pass; cached for `stats_cache_ttl` seconds.
+    """
+    key = query_cache_key(params)
+    cached = await stats_cache.get(key)
+    if cached is not None:
+        return cached
+    # до запроса: результат, прочитанный до параллельной записи, не переживёт её инвалидацию
+    generation = await stats_cache.generation()
+
+    # STATUS_EXPR — во вложенный запрос: GROUP BY по колонке, а не по CASE с bind-параметрами
+    base = apply_filters(select(Equipment.type, STATUS_EXPR).select_from(EQUIPMENT_FROM), params)
+    if params.get("include_archived"):
+        base = with_archive(base)
+    base = base.subquery()
+    stmt = select(base.c.type, base.c.status, func.count()).group_by(base.c.type, base.c.status)
+    rows = (await db.execute(stmt)).all()
+
+    result = EquipmentStats(total=0, by_status={}, by_type={})
+    for type_, status_value, n in rows:
+        result.total += n
+        result.by_status[status_value] = result.by_status.get(status_value, 0) + n
+        per_type = result.by_type.setdefault(type_, EquipmentTypeStats(total=0, by_status={}))
+        per_type.total += n
+        per_type.by_status[status_value] = n
+
+    if not await may_miss_recent_write(db, stats_cache):
+        await stats_cache.set(key, result, generation)
+    return result
+
+
+@router.get("/{equipment_id}", response_model=EquipmentRead)
+async def get_equipment(
+    equipment_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_local_db),  # noqa: B008
+):
+    """Single row with a strong `ETag` (304 on a matching `If-None-Match`)."""
+    try:
+        # канонический вид UUID — тот же ключ, что инвалидируют пишущие ручки
+        key = str(uuid.UUID(equipment_id))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail="Equipment not found") from e
+
+    entry = await detail_cache.get(key)
+    if entry is not None and entry.day == date.today().isoformat():
+        return cached_response(request, entry)
+    generation = await detail_cache.generation()
+
+    binds = {"equipment_id": uuid.UUID(key)}
+    row = (await db.execute(DETAIL_STMT, binds)).first()
+    if row is None and is_replica(db):
+        # только что созданная запись могла ещё не дойти до реплики
+        async with SessionLocal() as primary:
+            row = (await primary.execute(DETAIL_STMT, binds)).first()
+    if row is None:
+        # списанный прибор: карточка открывается и из архива
+        row = (await db.execute(DETAIL_ALL_STMT, binds)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Equipment not found")
 
-    eq, ver_date, interval_months, next_date, state, status_value = row
-    return {
-        "id": str(eq.id),
-        "name": eq.name,
-        "type": eq.type,
-        "serial_number": eq.serial_number,
-        "inventory_number": eq.inventory_number,
-        "created_at": eq.created_at,
-        "updated_at": eq.updated_at,
-        "verification_date": ver_date,
-        "interval_months": interval_months,
-        "next_verification_date": next_date,
-        "state": state,
-        "status": status_value,
-    }
+    entry = make_cached(dump_equipment(EQUIPMENT_ADAPTER, row))
+    if not await may_miss_recent_write(db, detail_cache):
+        await detail_cache.set(key, entry, generation)
+    return cached_response(request, entry)
+
+
+@router.get("/{equipment_id}/verifications", response_model=list[VerificationHistoryRead])
+async def list_verifications(
+    equipment_id: str,
+    db: AsyncSession = Depends(get_read_db),  # noqa: B008
+):
+    """
+    Verification history, newest first (index uq_verification_history_equipment_date).
+    Kept after the equipment is deleted, for audits.
+    """
+    try:
+        eq_uuid = uuid.UUID(equipment_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail="Equipment not found") from e
+
+    stmt = (
+        select(VerificationHistory)
+        .where(VerificationHistory.equipment_id == str(eq_uuid))
+        .order_by(VerificationHistory.verification_date.desc())
+    )
+    history = (await db.execute(stmt)).scalars().all()
+    if not history and await db.get(Equipment, eq_uuid) is None:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    return history
 
 
 @router.post("/", response_model=EquipmentRead, status_code=status.HTTP_201_CREATED)
-def create_equipment(payload: EquipmentCreate, db: Session = Depends(get_db)):  # noqa: B008
+@queue_when_offline
+async def create_equipment(
+    payload: EquipmentCreate,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+    actor: str | None = Header(
+        None, alias="X-User", max_length=100, description="Who makes the change (audit)"
+    ),
+):
     try:
         eq = Equipment(
             name=payload.name,
@@ -256,7 +1044,7 @@ def create_equipment(payload: EquipmentCreate, db: Session = Depends(get_db)):
             state=payload.state,
         )
         db.add(eq)
-        db.flush()  # получим eq.id
+        await db.flush()  # получим eq.id
 
         # создаём verification, только если заданы оба поля
         if payload.verification_date is not None and payload.interval_months is not None:
@@ -267,85 +1055,97 @@ def create_equipment(payload: EquipmentCreate, db: Session = Depends(get_db)):
             )
             db.add(ver)
 
-        db.commit()
+        await db.commit()
+        await invalidate_equipment()
 
     except IntegrityError as e:
-        db.rollback()
-        # Читаемая диагностика без длинных строк
-        orig = getattr(e, "orig", None)
-        msg = "Integrity error"
-
-        def _diag_attr(name: str):
-            diag = getattr(orig, "diag", None)
-            return getattr(diag, name, None) if diag is not None else None
-
-        if isinstance(orig, UniqueViolation):
-            msg = f"Unique violation (constraint={_diag_attr('constraint_name')})"
-        elif isinstance(orig, CheckViolation):
-            msg = f"Check violation (constraint={_diag_attr('constraint_name')})"
-        elif isinstance(orig, NotNullViolation):
-            msg = f"Not null violation (column={_diag_attr('column_name')})"
-        elif isinstance(orig, ForeignKeyViolation):
-            msg = f"Foreign key violation (constraint={_diag_attr('constraint_name')})"
-        else:
-            with contextlib.suppress(Exception):
-                msg = str(orig)
-        raise HTTPException(status_code=400, detail=msg) from e
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=integrity_detail(e)) from e
 
-    return get_equipment(str(eq.id), db)
+    row = await fetch_equipment_row(db, str(eq.id))
+    await audit.record([audit_entry(eq.id, "create", None, row._mapping, actor)])
+    return equipment_response(EQUIPMENT_ADAPTER, row, status_code=status.HTTP_201_CREATED)
 
 
 @router.patch("/{equipment_id}", response_model=EquipmentRead)
-def update_equipment(
+@queue_when_offline
+async def update_equipment(
     equipment_id: str,
     payload: EquipmentUpdate,
-    db: Session = Depends(get_db),  # noqa: B008
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+    actor: str | None = Header(
+        None, alias="X-User", max_length=100, description="Who makes the change (audit)"
+    ),
 ):
-    eq: Equipment | None = db.get(Equipment, equipment_id)
-    if not eq:
-        raise HTTPException(status_code=404, detail="Equipment not found")
-
-    # частичное обновление
-    if payload.name is not None:
-        eq.name = payload.name
-    if payload.type is not None:
-        eq.type = payload.type
-    if payload.serial_number is not None:
-        eq.serial_number = payload.serial_number
-    if payload.inventory_number is not None:
-        eq.inventory_number = payload.inventory_number
-    if payload.state is not None:
-        eq.state = payload.state
-
-    # верификация (создадим/обновим, если пришли поля)
-    if payload.verification_date is not None or payload.interval_months is not None:
-        ver = db.query(Verification).filter(Verification.equipment_id == equipment_id).one_or_none()
-        if ver is None:
-            ver = Verification(
-                equipment_id=equipment_id,
-                verification_date=payload.verification_date,
-                interval_months=payload.interval_months or 0,
-            )
-            db.add(ver)
-        else:
-            if payload.verification_date is not None:
-                ver.verification_date = payload.verification_date
-            if payload.interval_months is not None:
-                ver.interval_months = payload.interval_months
+    try:
+        item = EquipmentBatchUpdate(id=equipment_id, **payload.model_dump(exclude_unset=True))
+    except ValidationError as e:  # id не UUID
+        raise HTTPException(status_code=404, detail="Equipment not found") from e
 
     try:
-        db.commit()
+        entries = await apply_equipment_updates(db, [item], actor)
+        await db.commit()
+        await invalidate_equipment([item.id])
     except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Integrity error") from e
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=integrity_detail(e)) from e
+    await audit.record(entries)
 
-    return get_equipment(equipment_id, db)
+    row = await fetch_equipment_row(db, str(item.id))
+    return equipment_response(EQUIPMENT_ADAPTER, row)
 
 
 @router.delete("/{equipment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_equipment(equipment_id: str, db: Session = Depends(get_db)):  # noqa: B008
-    eq: Equipment | None = db.get(Equipment, equipment_id)
-    if not eq:
+@queue_when_offline
+async def delete_equipment(
+    equipment_id: str,
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+    actor: str | None = Header(
+        None, alias="X-User", max_length=100, description="Who makes the change (audit)"
+    ),
+):
+    try:
+        eq_uuid = uuid.UUID(equipment_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail="Equipment not found") from e
+
+    # "было" для аудита; строка блокируется до DELETE
+    stmt = audit_select().where(Equipment.id == eq_uuid).with_for_update(of=Equipment)
+    before = (await db.execute(stmt)).first()
+    if before is None and await restore_archived(db, EquipmentArchive.id == eq_uuid):
+        # списанный: через горячую таблицу, чтобы лента изменений получила 'delete'
+        before = (await db.execute(stmt)).first()
+    if before is None:
         raise HTTPException(status_code=404, detail="Equipment not found")
-    db.delete(eq)  # каскад на Verification у тебя уже настроен
-    db.commit()
+    await db.execute(
+        delete(Equipment).where(Equipment.id == eq_uuid)
+    )  # verification — ON DELETE CASCADE
+    await db.commit()
+    await invalidate_equipment([eq_uuid])
+    await audit.record([audit_entry(eq_uuid, "delete", before._mapping, None, actor)])
+
+
+@router.get("/{equipment_id}/audit", response_model=list[EquipmentAuditRead])
+async def list_audit(
+    equipment_id: str,
+    before: datetime | None = Query(None, description="Entries older than this (paging)"),  # noqa: B008
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),  # noqa: B008
+):
+    """
+    Audit trail of the instrument, newest first (ix_equipment_audit_equipment_changed):
+    who changed what, with {field: [before, after]}. Kept after the equipment is
+    deleted. Entries are written in batches, so the last second of changes may
+    not be visible yet. Next page: `before=<changed_at of the last entry>`.
+    """
+    try:
+        eq_uuid = uuid.UUID(equipment_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail="Equipment not found") from e
+
+    stmt = select(EquipmentAudit).where(EquipmentAudit.equipment_id == str(eq_uuid))
+    if before is not None:
+        # ключ партиции в условии — старые месяцы отсекаются без сканирования
+        stmt = stmt.where(EquipmentAudit.changed_at < before)
+    stmt = stmt.order_by(EquipmentAudit.changed_at.desc(), EquipmentAudit.id.desc()).limit(limit)
+    return (await db.execute(stmt)).scalars().all()
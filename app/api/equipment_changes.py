@@ -0,0 +1,134 @@
+# app/api/equipment_changes.py
+"""
+Change feed: GET /equipment/changes (long-poll) and /equipment/changes/stream (SSE).
+
+Client flow: take the current version (`GET /equipment/changes` without `since`),
+load the list, then ask for changes since that version and re-fetch only the
+changed ids (POST /equipment/batch-get); `op=delete` rows are removed locally.
+
+Timestamp-based delta sync uses the same table: GET /equipment?updated_since=T
+plus GET /equipment/deleted?since=T (tombstones).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from ..changes import notifier, tombstones
+from ..db import SessionLocal
+from ..models.equipment_change import EquipmentChange
+from ..schemas.equipment import EquipmentChangeFeed, EquipmentChangeRead, EquipmentTombstone
+
+router = APIRouter(prefix="/equipment", tags=["equipment"])
+
+CHANGES_MAX_LIMIT = 10_000
+LONG_POLL_MAX_WAIT = 30.0  # < idle-таймаутов прокси и WebView
+SSE_BATCH = 1000
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+# Своя короткая сессия на каждое чтение: между чтениями handler ждёт NOTIFY,
+# и соединение из пула на это время держать незачем.
+async def _head_version() -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.coalesce(func.max(EquipmentChange.version), 0)))
+
+
+async def _read_changes(since: int, limit: int) -> EquipmentChangeFeed:
+    stmt = (
+        select(
+            EquipmentChange.version,
+            EquipmentChange.equipment_id.label("id"),
+            EquipmentChange.op,
+            EquipmentChange.changed_at,
+        )
+        .where(EquipmentChange.version > since)
+        .order_by(EquipmentChange.version)
+        .limit(limit)
+    )
+    async with SessionLocal() as db:
+        rows = (await db.execute(stmt)).all()
+    changes = [EquipmentChangeRead.model_validate(r, from_attributes=True) for r in rows]
+    return EquipmentChangeFeed(version=changes[-1].version if changes else since, changes=changes)
+
+
+@router.get("/changes", response_model=EquipmentChangeFeed)
+async def list_changes(
+    since: int | None = Query(None, ge=0, description="Last seen version; omit to get the head"),
+    limit: int = Query(1000, ge=1, le=CHANGES_MAX_LIMIT),
+    wait: float = Query(
+        0, ge=0, le=LONG_POLL_MAX_WAIT, description="Long-poll: seconds to wait for a change"
+    ),
+):
+    """
+    Changes with version > `since`, oldest first. With `wait` the request is held
+    until the first change is committed (or `wait` expires → empty `changes`).
+    A full page (`limit` rows) means more are available: ask again right away.
+    """
+    if since is None:
+        return EquipmentChangeFeed(version=await _head_version(), changes=[])
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        ticket = notifier.ticket()
+        feed = await _read_changes(since, limit)
+        remaining = deadline - loop.time()
+        if feed.changes or remaining <= 0:
+            return feed
+        await notifier.wait(ticket, remaining)
+
+
+async def _sse_events(since: int | None) -> AsyncIterator[str]:
+    if since is None:
+        since = await _head_version()
+    yield "retry: 3000\n\n"
+    while True:
+        ticket = notifier.ticket()
+        feed = await _read_changes(since, SSE_BATCH)
+        for change in feed.changes:
+            yield f"id: {change.version}\nevent: change\ndata: {change.model_dump_json()}\n\n"
+        since = feed.version
+        if len(feed.changes) == SSE_BATCH:
+            continue
+        if not await notifier.wait(ticket, SSE_KEEPALIVE_SECONDS):
+            # комментарий: держит соединение живым через прокси
+            yield ": keepalive\n\n"
+
+
+@router.get("/changes/stream")
+async def stream_changes(
+    since: int | None = Query(None, ge=0, description="Default: current head"),
+    last_event_id: int | None = Header(None, ge=0),
+):
+    """
+    Server-sent events: one `change` event per row, `id:` = version. On reconnect
+    the browser sends `Last-Event-ID` and the stream resumes after it.
+    """
+    return StreamingResponse(
+        _sse_events(last_event_id if last_event_id is not None else since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/deleted", response_model=list[EquipmentTombstone])
+async def list_deleted(
+    since: datetime = Query(..., description="Inclusive; ISO 8601 timestamp"),  # noqa: B008
+):
+    """
+    Ids deleted at or after `since` (partial index ix_equipment_change_deleted_at)
+    and not restored since (a written-off row restored from the archive keeps its id).
+
+    Timestamps are transaction start times (now()), as is updated_at: pass the
+    start of the previous sync minus a safety margin, re-applying a delete is harmless.
+    """
+    async with SessionLocal() as db:
+        rows = (await db.execute(tombstones(since))).all()
+    return [EquipmentTombstone.model_validate(r, from_attributes=True) for r in rows]
@@ -0,0 +1,373 @@
+# app/api/equipment_io.py
+"""Bulk import and streaming export of the equipment register (CSV / NDJSON)."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..audit import audit, audit_entry, audit_select
+from ..cache import invalidate_equipment
+from ..deps.db import get_db
+from ..mirror import local_read_session
+from ..models.equipment import Equipment
+from ..models.equipment_archive import EquipmentArchive
+from ..models.verification import Verification
+from ..schemas.equipment import BulkImportResult, BulkRowError, EquipmentCreate
+from .equipment import (
+    EQUIPMENT_COLUMNS,
+    EquipmentQuery,
+    apply_filters,
+    apply_order,
+    equipment_select,
+    get_equipment_query,
+    integrity_detail,
+    restore_archived,
+    with_archive,
+)
+
+router = APIRouter(prefix="/equipment", tags=["equipment"])
+
+BULK_BATCH_SIZE = 1000  # строк на один INSERT ... RETURNING
+BULK_MAX_REPORTED_ERRORS = 1000
+
+EQUIPMENT_FIELDS = {"name", "type", "serial_number", "inventory_number", "state"}
+
+
+# -----------------------------
+# Streaming parsers
+# -----------------------------
+async def _aiter_lines(request: Request) -> AsyncIterator[str]:
+    """Lines of the request body, decoded as UTF-8 while it is being received."""
+    buf = b""
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buf:
+        yield buf.decode("utf-8-sig").rstrip("\r")
+
+
+async def _iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | str]]:
+    """(row, object) or (row, error message); blank lines are skipped."""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            yield row, f"Invalid JSON: {e}"
+            continue
+        yield row, obj if isinstance(obj, dict) else "Expected a JSON object"
+
+
+async def _iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    (row, record) or (row, error message). The first line is the header.
+    Quoted values with embedded newlines are not supported (one record per line).
+    """
+    header: list[str] | None = None
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # пустая ячейка = поле не задано (state по умолчанию, без верификации)
+        yield row, {k: v for k, v in zip(header, values, strict=True) if v != ""}
+
+
+# -----------------------------
+# Loader
+# -----------------------------
+class _BulkLoader:
+    """
+    Loads validated rows in batches inside the caller's transaction; audit
+    entries are collected in `entries` and recorded by the caller after commit.
+    """
+
+    def __init__(self, db: AsyncSession, upsert: bool, actor: str | None = None) -> None:
+        self.db = db
+        self.upsert = upsert
+        self.actor = actor
+        self.result = BulkImportResult()
+        self.entries: list[dict | None] = []
+        self._batch: list[tuple[int, EquipmentCreate]] = []
+        self._seen_inventory: set[str] = set()
+
+    def error(self, row: int, detail: str) -> None:
+        self.result.error_count += 1
+        if len(self.result.errors) < BULK_MAX_REPORTED_ERRORS:
+            self.result.errors.append(BulkRowError(row=row, detail=detail))
+
+    async def add(self, row: int, payload: EquipmentCreate) -> None:
+        if self.upsert:
+            # один inventory_number дважды в одном файле — неоднозначно, что оставить
+            if payload.inventory_number in self._seen_inventory:
+                self.error(row, "Duplicate inventory_number in import")
+                return
+            self._seen_inventory.add(payload.inventory_number)
+        self._batch.append((row, payload))
+        if len(self._batch) >= BULK_BATCH_SIZE:
+            await self.flush()
+
+    async def _matches(self, numbers: list[str]) -> dict[str, list]:
+        """inventory_number -> rows of the register with it, locked ("before" for audit)."""
+        stmt = audit_select().with_for_update(of=Equipment)
+        matches: dict[str, list] = {}
+        for row in await self.db.execute(stmt.where(Equipment.inventory_number.in_(numbers))):
+            matches.setdefault(row.inventory_number, []).append(row._mapping)
+        # списанный номер без живой строки возвращается из архива и обновляется, а не
+        # дублируется; номер, уже выданный новому прибору, обновляет этот прибор
+        missing = [number for number in numbers if number not in matches]
+        if missing:
+            restored = await restore_archived(
+                self.db, EquipmentArchive.inventory_number.in_(missing)
+            )
+            if restored:
+                for row in await self.db.execute(stmt.where(Equipment.id.in_(restored))):
+                    matches.setdefault(row.inventory_number, []).append(row._mapping)
+        return matches
+
+    async def flush(self) -> None:
+        rows, self._batch = self._batch, []
+        if not rows:
+            return
+        batch = [p for _, p in rows]
+
+        # inventory_number -> текущая строка ("было" для аудита)
+        existing: dict = {}
+        if self.upsert:
+            matches = await self._matches([p.inventory_number for p in batch])
+            # уникальности inventory_number в схеме нет: несколько строк с номером — не
+            # угадываем, какую обновить
+            ambiguous = {number for number, found in matches.items() if len(found) > 1}
+            for row_no, p in rows:
+                if p.inventory_number in ambiguous:
+                    n = len(matches[p.inventory_number])
+                    self.error(row_no, f"Ambiguous inventory_number: {n} rows in the register")
+            batch = [p for p in batch if p.inventory_number not in ambiguous]
+            existing = {number: found[0] for number, found in matches.items() if len(found) == 1}
+
+        to_insert = [p for p in batch if p.inventory_number not in existing]
+        to_update = [p for p in batch if p.inventory_number in existing]
+
+        # (строка импорта, id оборудования) — для вставки verification
+        loaded: list[tuple[EquipmentCreate, str]] = []
+        if to_insert:
+            # insertmanyvalues: многострочный INSERT ... RETURNING в порядке параметров
+            inserted = await self.db.execute(
+                insert(Equipment).returning(Equipment.id, sort_by_parameter_order=True),
+                [p.model_dump(include=EQUIPMENT_FIELDS) for p in to_insert],
+            )
+            for p, eq_id in zip(to_insert, inserted.scalars(), strict=True):
+                loaded.append((p, str(eq_id)))
+                self.entries.append(audit_entry(eq_id, "create", None, _after(p), self.actor))
+            self.result.inserted += len(to_insert)
+
+        if to_update:
+            # ORM bulk UPDATE по первичному ключу (executemany, группировка по набору полей);
+            # обновляем только поля, явно заданные в строке импорта
+            await self.db.execute(
+                update(Equipment),
+                [
+                    {
+                        "id": existing[p.inventory_number]["id"],
+                        **p.model_dump(include=EQUIPMENT_FIELDS, exclude_unset=True),
+                    }
+                    for p in to_update
+                ],
+            )
+            for p in to_update:
+                before = existing[p.inventory_number]
+                loaded.append((p, str(before["id"])))
+                self.entries.append(
+                    audit_entry(before["id"], "update", before, _after(p, before), self.actor)
+                )
+            self.result.updated += len(to_update)
+
+        # верификация — только если заданы оба поля (как в create_equipment)
+        verifications = [
+            {
+                "equipment_id": eq_id,
+                "verification_date": p.verification_date,
+                "interval_months": p.interval_months,
+            }
+            for p, eq_id in loaded
+            if p.verification_date is not None and p.interval_months is not None
+        ]
+        if verifications:
+            stmt = pg_insert(Verification)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Verification.equipment_id],
+                set_={
+                    "verification_date": stmt.excluded.verification_date,
+                    "interval_months": stmt.excluded.interval_months,
+                },
+            )
+            await self.db.execute(stmt, verifications)
+
+
+def _after(p: EquipmentCreate, before=None) -> dict:
+    """State after loading row `p` over `before` (same rules as flush())."""
+    after = {**(before or {}), **p.model_dump(include=EQUIPMENT_FIELDS, exclude_unset=True)}
+    if before is None:
+        after["state"] = p.state  # значение по умолчанию тоже попадает в INSERT
+    if p.verification_date is not None and p.interval_months is not None:
+        after["verification_date"] = p.verification_date
+        after["interval_months"] = p.interval_months
+    return after
+
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_equipment(
+    request: Request,
+    fmt: Literal["csv", "ndjson"] | None = Query(
+        None, alias="format", description="Default: from Content-Type (text/csv → csv)"
+    ),
+    upsert: bool = Query(False, description="Update rows with an existing inventory_number"),
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+    actor: str | None = Header(
+        None, alias="X-User", max_length=100, description="Who makes the change (audit)"
+    ),
+):
+    """
+    Bulk load equipment (+ verification) from CSV (header row) or NDJSON.
+
+    The body is parsed while it streams in; every row is validated with
+    EquipmentCreate and invalid rows are reported with their row number and skipped.
+    Valid rows are inserted in batches of BULK_BATCH_SIZE, all in one transaction:
+    a database error rolls back the whole import.
+    """
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "csv" if "csv" in content_type else "ndjson"
+
+    lines = _aiter_lines(request)
+    records = _iter_csv(lines) if fmt == "csv" else _iter_ndjson(lines)
+
+    loader = _BulkLoader(db, upsert=upsert, actor=actor)
+    try:
+        async for row, record in records:
+            if isinstance(record, str):
+                loader.error(row, record)
+                continue
+            try:
+                payload = EquipmentCreate.model_validate(record)
+            except ValidationError as e:
+                loader.error(row, "; ".join(_format_error(err) for err in e.errors()))
+                continue
+            await loader.add(row, payload)
+        await loader.flush()
+        await db.commit()
+        # upsert мог изменить любые существующие строки; вставка — только списки
+        await invalidate_equipment(None if loader.result.updated else ())
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=integrity_detail(e)) from e
+    except UnicodeDecodeError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Body must be UTF-8") from e
+
+    await audit.record(loader.entries)
+    return loader.result
+
+
+def _format_error(err) -> str:
+    loc = ".".join(str(p) for p in err.get("loc", ()))
+    return f"{loc}: {err.get('msg')}" if loc else str(err.get("msg"))
+
+
+# -----------------------------
+# Streaming export
+# -----------------------------
+EXPORT_CHUNK_ROWS = 2000  # строк на один fetch из server-side курсора
+EXPORT_FIELDS = tuple(col.key for col in EQUIPMENT_COLUMNS)
+
+
+async def _stream_partitions(stmt) -> AsyncIterator[list]:
+    """
+    Row tuples in chunks from a server-side cursor. The session is owned by the
+    generator: it must outlive the handler, until the response is fully sent.
+    """
+    async with local_read_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for partition in result.partitions():
+            yield partition
+
+
+def _json_default(value):
+    if isinstance(value, date | datetime):
+        return value.isoformat()
+    raise TypeError(f"Unserializable: {type(value).__name__}")
+
+
+async def _export_csv(stmt) -> AsyncIterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    # BOM — чтобы Excel открыл кириллицу в UTF-8; None пишется пустой ячейкой
+    buf.write("\ufeff")
+    writer.writerow(EXPORT_FIELDS)
+    async for partition in _stream_partitions(stmt):
+        writer.writerows(partition)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+async def _export_ndjson(stmt) -> AsyncIterator[str]:
+    async for partition in _stream_partitions(stmt):
+        yield "".join(
+            json.dumps(
+                dict(zip(EXPORT_FIELDS, row, strict=True)),
+                ensure_ascii=False,
+                default=_json_default,
+            )
+            + "\n"
+            for row in partition
+        )
+
+
+@router.get("/export")
+async def export_equipment(
+    fmt: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    params: EquipmentQuery = Depends(get_equipment_query),  # noqa: B008
+):
+    """
+    Full register export with the same filters/sort as GET /equipment
+    (limit/offset/cursor are ignored). Rows are streamed from a server-side
+    cursor, so memory use does not depend on the fleet size.
+    """
+    stmt = apply_order(apply_filters(equipment_select(), params), params)
+    if params.get("include_archived"):
+        stmt = with_archive(stmt)
+    if fmt == "csv":
+        body, media_type = _export_csv(stmt), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _export_ndjson(stmt), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="equipment.{fmt}"'},
+    )
@@ -0,0 +1,218 @@
+# app/audit.py
+"""
+Audit trail of equipment changes (equipment_audit).
+
+Write handlers build entries with before/after values of AUDIT_FIELDS
+(`audit_entry()`; "before" comes from the same locked SELECT that checks the
+rows exist) and hand them to `audit.record()` after commit. AuditWriter
+collects entries in an in-process queue and writes them in batches: up to
+`audit_batch_size` rows or whatever arrived within `audit_flush_interval`
+seconds, one executemany INSERT per batch. The request only pays for a
+queue put; a full queue (the database is down) slows writers down instead
+of dropping entries.
+
+A batch the database rejects for its data (DataError/IntegrityError) is not
+retried as a whole: it is written entry by entry and only the rejected entries
+are dropped (logged).
+
+Trade-off: entries still queued when the process is killed (not stopped) are
+lost; on a normal shutdown the queue is drained within `shutdown_timeout`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Iterable, Mapping
+from datetime import date, datetime
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DataError, IntegrityError
+
+from .config import settings
+from .db import SessionLocal
+from .metrics import AUDIT_ENTRIES_DROPPED, AUDIT_FLUSH_ERRORS, Gauge
+from .models.audit import EquipmentAudit
+from .models.equipment import Equipment
+from .models.verification import Verification
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FIELDS = (
+    "name",
+    "type",
+    "serial_number",
+    "inventory_number",
+    "state",
+    "verification_date",
+    "interval_months",
+)
+
+FLUSH_ATTEMPTS = 5
+FLUSH_RETRY_MAX_DELAY = 30.0
+
+_STOP = object()
+
+
+def audit_select():
+    """Equipment id + AUDIT_FIELDS: the "before" state of a change."""
+    return select(
+        Equipment.id,
+        Equipment.name,
+        Equipment.type,
+        Equipment.serial_number,
+        Equipment.inventory_number,
+        Equipment.state,
+        Verification.verification_date,
+        Verification.interval_months,
+    ).join(Verification, Verification.equipment_id == Equipment.id, isouter=True)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def audit_entry(
+    equipment_id,
+    action: str,
+    before: Mapping | None,
+    after: Mapping | None,
+    actor: str | None,
+) -> dict | None:
+    """
+    Row for equipment_audit with {field: [before, after]} for the fields that
+    differ; None for an update that changed nothing.
+    """
+    changes = {}
+    for field in AUDIT_FIELDS:
+        old = before.get(field) if before is not None else None
+        new = after.get(field) if after is not None else None
+        if old != new:
+            changes[field] = [_json_value(old), _json_value(new)]
+    if not changes and action == "update":
+        return None
+    return {
+        "equipment_id": str(equipment_id),
+        "action": action,
+        "changes": changes,
+        "actor": actor,
+        # время изменения, а не записи пачки
+        "changed_at": datetime.now(),
+    }
+
+
+def _month(ts: datetime) -> datetime:
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+class AuditWriter:
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        # месяцы, партиции которых уже проверены этим процессом
+        self._months: set[datetime] = set()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=settings.audit_queue_size)
+            self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self) -> None:
+        """Flush what is queued, then stop."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, settings.shutdown_timeout)
+        except TimeoutError:
+            AUDIT_ENTRIES_DROPPED.inc(self._queue.qsize())
+            logger.error("audit writer stopped with %d entries unwritten", self._queue.qsize())
+        self._task = self._queue = None
+
+    async def record(self, entries: Iterable[dict | None]) -> None:
+        entries = [e for e in entries if e is not None]
+        if not entries:
+            return
+        if self._task is None:
+            # писатель не запущен (CLI, повтор очереди без lifespan) — пишем сразу
+            await self._write(entries)
+            return
+        for entry in entries:
+            await self._queue.put(entry)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + settings.audit_flush_interval
+            while len(batch) < settings.audit_batch_size:
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                except TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: list[dict]) -> None:
+        delay = 1.0
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                await self._flush(batch)
+                return
+            except (DataError, IntegrityError):
+                # ошибка в самих данных повтором не лечится: пишем по одной записи,
+                # чтобы одна плохая запись не потянула за собой всю пачку
+                AUDIT_FLUSH_ERRORS.inc()
+                logger.exception("audit flush of %d entries rejected", len(batch))
+                if len(batch) > 1:
+                    for entry in batch:
+                        await self._write([entry])
+                    return
+                break
+            except Exception:
+                AUDIT_FLUSH_ERRORS.inc()
+                logger.exception(
+                    "audit flush of %d entries failed (attempt %d/%d)",
+                    len(batch),
+                    attempt,
+                    FLUSH_ATTEMPTS,
+                )
+                if attempt < FLUSH_ATTEMPTS:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, FLUSH_RETRY_MAX_DELAY)
+        # не теряем молча: пачка целиком уходит в лог
+        AUDIT_ENTRIES_DROPPED.inc(len(batch))
+        logger.error(
+            "audit entries dropped: %s", json.dumps(batch, default=str, ensure_ascii=False)
+        )
+
+    async def _flush(self, batch: list[dict]) -> None:
+        months = {_month(e["changed_at"]) for e in batch} - self._months
+        async with SessionLocal() as db:
+            for month in sorted(months):
+                await db.execute(select(func.equipment_audit_ensure_partition(month)))
+            # executemany: psycopg отправляет пачку за один round-trip (pipeline)
+            await db.execute(insert(EquipmentAudit), batch)
+            await db.commit()
+        self._months |= months
+
+
+audit = AuditWriter()
+
+Gauge(
+    "metrology_audit_queue_size",
+    "Audit entries waiting to be written",
+    lambda: audit.queued,
+)
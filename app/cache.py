@@ -0,0 +1,403 @@
+# app/cache.py
+"""
+Caches for read endpoints.
+
+TTLCache is an in-process, size-bounded LRU with an optional per-entry TTL.
+SQLiteCache has the same (async) interface over a SQLite file shared by the
+workers of one server (`main.py serve --workers N`): an invalidation in one
+worker is seen by all of them. Write paths call `invalidate_equipment()` after a successful
+commit; ChangeNotifier (app/changes.py) calls it on every NOTIFY equipment_changes
+with the ids logged in equipment_change since the previous one, which also covers
+writers outside this process (other backends on the same database,
+`main.py archive`, raw SQL, migrations).
+
+list_cache / detail_cache hold ready JSON bodies of GET /equipment and
+GET /equipment/{id} together with their strong ETag.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from .config import settings
+from .schemas.equipment import EquipmentStats
+
+
+class _Cache:
+    """
+    Async interface of both backends. Subclasses implement the synchronous
+    `_get/_set/...`; `_call` runs them (SQLiteCache: in a thread, off the event loop).
+    """
+
+    async def _call(self, fn, *args):
+        return fn(*args)
+
+    async def get(self, key: Hashable) -> Any | None:
+        return await self._call(self._get, key)
+
+    async def set(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        """Store `value`; skipped if `generation` is given and the cache was invalidated since."""
+        await self._call(self._set, key, value, generation)
+
+    async def delete(self, key: Hashable) -> None:
+        await self._call(self._delete_many, [key])
+
+    async def clear(self) -> None:
+        await self._call(self._clear)
+
+    async def generation(self) -> int:
+        """Grows with every invalidation: read it before the query, pass to `set()`."""
+        return await self._call(self._generation)
+
+    async def changed_at(self) -> float:
+        """time.time() of the last invalidation (see app/replica.py)."""
+        return await self._call(self._changed_at)
+
+
+class TTLCache(_Cache):
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # растёт при каждой инвалидации: значение, прочитанное из БД до неё, не кладём
+        self._gen = 0
+        self._changed = 0.0  # time.time() последней инвалидации
+
+    def _generation(self) -> int:
+        return self._gen
+
+    def _changed_at(self) -> float:
+        return self._changed
+
+    def _get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: Hashable, value: Any, generation: int | None) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self._gen:
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _delete_many(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+            self._gen += 1
+            self._changed = time.time()
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._gen += 1
+            self._changed = time.time()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_cache_entry_stored_at ON cache_entry (ns, stored_at);
+CREATE TABLE IF NOT EXISTS cache_generation (
+    ns TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    changed_at REAL NOT NULL
+);
+"""
+
+
+class Codec(NamedTuple):
+    """How SQLiteCache turns a value into bytes and back (no pickle: the file is data only)."""
+
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+class _SQLiteFile:
+    """One connection per cache file and process, shared by its namespaces."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self.lock = threading.Lock()
+
+    def db(self) -> sqlite3.Connection:
+        # открываем лениво: в воркере, а не в родителе до fork/spawn
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            # файл пересоздаётся при каждом запуске serve — fsync не нужен
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(_SQLITE_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def write(self):
+        with self.lock:
+            conn = self.db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def read(self, sql: str, params: tuple) -> tuple | None:
+        with self.lock:
+            return self.db().execute(sql, params).fetchone()
+
+
+@functools.cache
+def _sqlite_file(path: str) -> _SQLiteFile:
+    return _SQLiteFile(path)
+
+
+class SQLiteCache(_Cache):
+    """
+    TTLCache over a SQLite file (WAL) shared by several processes.
+
+    Keys are stored as repr(), values as bytes of the namespace's `codec`:
+    reading the file never executes code from it. The generation counter lives in
+    the same file, so the stale-write guard of `set()` works across workers.
+    Eviction drops the oldest written entries (reads do not update LRU order).
+    Every call runs in a worker thread: SQLite I/O (and waiting for the write
+    lock of another process, up to 5 s) never blocks the event loop.
+    """
+
+    def __init__(
+        self, path: str, namespace: str, codec: Codec, maxsize: int, ttl: float | None = None
+    ) -> None:
+        self.namespace = namespace
+        self.codec = codec
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.file = _sqlite_file(path)
+
+    async def _call(self, fn, *args):
+        return await asyncio.to_thread(fn, *args)
+
+    def _bump_generation(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "INSERT INTO cache_generation (ns, generation, changed_at) VALUES (?, 1, ?)"
+            " ON CONFLICT (ns) DO UPDATE SET generation = generation + 1,"
+            " changed_at = excluded.changed_at",
+            (self.namespace, time.time()),
+        )
+
+    def _generation(self) -> int:
+        row = self.file.read(
+            "SELECT generation FROM cache_generation WHERE ns = ?", (self.namespace,)
+        )
+        return row[0] if row else 0
+
+    def _changed_at(self) -> float:
+        row = self.file.read(
+            "SELECT changed_at FROM cache_generation WHERE ns = ?", (self.namespace,)
+        )
+        return row[0] if row else 0.0
+
+    def _get(self, key: Hashable) -> Any | None:
+        row = self.file.read(
+            "SELECT value, expires_at FROM cache_entry WHERE ns = ? AND key = ?",
+            (self.namespace, repr(key)),
+        )
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None  # вытеснится при следующей записи или перезапишется
+        return self.codec.decode(value)
+
+    def _set(self, key: Hashable, value: Any, generation: int | None) -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self.file.write() as conn:
+            # проверка поколения и запись — в одной транзакции (BEGIN IMMEDIATE)
+            if generation is not None:
+                row = conn.execute(
+                    "SELECT generation FROM cache_generation WHERE ns = ?", (self.namespace,)
+                ).fetchone()
+                if (row[0] if row else 0) != generation:
+                    return
+            conn.execute(
+                "INSERT INTO cache_entry (ns, key, value, expires_at, stored_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (ns, key) DO UPDATE SET value = excluded.value,"
+                " expires_at = excluded.expires_at, stored_at = excluded.stored_at",
+                (self.namespace, repr(key), self.codec.encode(value), expires_at, now),
+            )
+            conn.execute(
+                "DELETE FROM cache_entry WHERE ns = ? AND key IN ("
+                " SELECT key FROM cache_entry WHERE ns = ?"
+                " ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.maxsize),
+            )
+
+    def _delete_in(self, conn: sqlite3.Connection, keys: Iterable[Hashable]) -> None:
+        conn.executemany(
+            "DELETE FROM cache_entry WHERE ns = ? AND key = ?",
+            [(self.namespace, repr(key)) for key in keys],
+        )
+        self._bump_generation(conn)
+
+    def _clear_in(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache_entry WHERE ns = ?", (self.namespace,))
+        self._bump_generation(conn)
+
+    def _delete_many(self, keys: Iterable[Hashable]) -> None:
+        with self.file.write() as conn:
+            self._delete_in(conn, keys)
+
+    def _clear(self) -> None:
+        with self.file.write() as conn:
+            self._clear_in(conn)
+
+    def __len__(self) -> int:
+        row = self.file.read("SELECT count(*) FROM cache_entry WHERE ns = ?", (self.namespace,))
+        return row[0]
+
+
+@functools.cache
+def default_cache_path() -> str:
+    """
+    Cache file in a fresh private directory (mkdtemp: mode 0700, unpredictable name).
+    `serve` creates it once and hands it to the workers via METROLOGY_CACHE_PATH.
+    """
+    return str(Path(tempfile.mkdtemp(prefix="metrology-cache-")) / "cache.sqlite3")
+
+
+def shared_cache_enabled(workers: int) -> bool:
+    if not settings.cache_enabled:
+        return False
+    if settings.cache_backend == "auto":
+        return workers > 1
+    return settings.cache_backend == "sqlite"
+
+
+def make_cache(
+    name: str, codec: Codec, maxsize: int, ttl: float | None = None
+) -> TTLCache | SQLiteCache:
+    """Cache for this process or shared by all workers, depending on `cache_backend`."""
+    if not settings.cache_enabled:
+        # maxsize=0: запись тут же вытесняется, поколения и changed_at по-прежнему ведутся
+        return TTLCache(0, ttl)
+    if shared_cache_enabled(settings.workers):
+        return SQLiteCache(settings.cache_path or default_cache_path(), name, codec, maxsize, ttl)
+    return TTLCache(maxsize, ttl)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    headers: dict[str, str]
+    day: str  # CURRENT_DATE, на который посчитан статус
+
+
+def _encode_response(entry: CachedResponse) -> bytes:
+    # JSON-заголовок в одну строку (json.dumps не выводит переводов строк), затем тело как есть
+    meta = json.dumps({"etag": entry.etag, "headers": entry.headers, "day": entry.day})
+    return meta.encode() + b"\n" + entry.body
+
+
+def _decode_response(data: bytes) -> CachedResponse:
+    meta, body = data.split(b"\n", 1)
+    fields = json.loads(meta)
+    return CachedResponse(fields["etag"], body, fields["headers"], fields["day"])
+
+
+RESPONSE_CODEC = Codec(_encode_response, _decode_response)
+STATS_CODEC = Codec(
+    lambda stats: stats.model_dump_json().encode(), EquipmentStats.model_validate_json
+)
+# (total, "exact" | "estimated")
+COUNT_CODEC = Codec(lambda value: json.dumps(value).encode(), lambda data: tuple(json.loads(data)))
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag of a response body (identical across workers for identical bytes)."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# агрегаты GET /equipment/stats по нормализованному фильтру
+stats_cache = make_cache("stats", STATS_CODEC, maxsize=256, ttl=settings.stats_cache_ttl)
+# тела ответов GET /equipment (ключ — query_cache_key с пагинацией) и GET /equipment/{id}
+list_cache = make_cache(
+    "list", RESPONSE_CODEC, maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl
+)
+detail_cache = make_cache(
+    "detail", RESPONSE_CODEC, maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl
+)
+# X-Total-Count по нормализованному фильтру: (total, "exact" | "estimated")
+count_cache = make_cache(
+    "count", COUNT_CODEC, maxsize=settings.response_cache_size, ttl=settings.count_cache_ttl
+)
+
+
+def _invalidate(ids: list[str] | None) -> None:
+    derived = (stats_cache, list_cache, count_cache)
+    if isinstance(detail_cache, SQLiteCache):
+        # все пространства имён в одном файле: вся инвалидация — одна транзакция
+        with detail_cache.file.write() as conn:
+            for cache in derived:
+                cache._clear_in(conn)
+            if ids is None:
+                detail_cache._clear_in(conn)
+            else:
+                detail_cache._delete_in(conn, ids)
+        return
+    for cache in derived:
+        cache._clear()
+    if ids is None:
+        detail_cache._clear()
+    else:
+        detail_cache._delete_many(ids)
+
+
+async def invalidate_equipment(ids: Iterable[str] | None = ()) -> None:
+    """
+    Drop cached data derived from equipment/verification rows.
+
+    `ids` are the rows touched by the write: their detail entries are dropped,
+    other detail entries stay valid. `None` means "unknown set" (e.g. bulk upsert)
+    and drops every detail entry. Lists, counts and stats are always dropped: any
+    write can move a row in or out of a filtered page.
+    """
+    keys = None if ids is None else [str(equipment_id) for equipment_id in ids]
+    await detail_cache._call(_invalidate, keys)
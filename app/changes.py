@@ -0,0 +1,182 @@
+# app/changes.py
+"""
+LISTEN/NOTIFY for the equipment change feed.
+
+Triggers (migration 9f3b6d2e8a15) log every committed change to equipment_change
+and send NOTIFY equipment_changes. One ChangeNotifier per process keeps a
+dedicated connection with LISTEN and wakes up long-poll / SSE handlers; the
+changes themselves are always read from the table by version.
+
+Every NOTIFY also invalidates the response caches of app/cache.py, since the
+writer may be another process: the notifier reads the equipment_change rows
+after the last version it has seen and drops the detail entries of those ids
+(plus lists, counts and stats). Only a reconnect, when changes may have been
+missed, or a backlog above INVALIDATE_MAX_CHANGES wipes the caches completely.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from datetime import datetime
+
+import psycopg
+from sqlalchemy import exists, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import aliased
+
+from .cache import invalidate_equipment
+from .config import settings
+from .db import SessionLocal
+from .models.equipment_change import EquipmentChange
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "equipment_changes"
+# без LISTEN-соединения ожидающие перечитывают таблицу с этим интервалом
+FALLBACK_POLL_SECONDS = 2.0
+RECONNECT_MAX_DELAY = 30.0
+# больше изменений за один NOTIFY (bulk-импорт) — дешевле сбросить кэш целиком
+INVALIDATE_MAX_CHANGES = 10_000
+
+
+def _listen_conninfo() -> str:
+    # postgresql+psycopg://... -> postgresql://... (libpq)
+    url = make_url(settings.db_listen_url or settings.database_url)
+    return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def tombstones(since: datetime):
+    """
+    SELECT id, deleted_at of rows deleted at or after `since` whose delete is
+    still their latest change: a written-off row restored from equipment_archive
+    keeps its id, and its older 'delete' must not remove it again.
+    """
+    later = aliased(EquipmentChange)
+    return (
+        select(
+            EquipmentChange.equipment_id.label("id"),
+            EquipmentChange.changed_at.label("deleted_at"),
+        )
+        .where(
+            EquipmentChange.op == "delete",
+            EquipmentChange.changed_at >= since,
+            # ix_equipment_change_equipment_version
+            ~exists().where(
+                later.equipment_id == EquipmentChange.equipment_id,
+                later.version > EquipmentChange.version,
+            ),
+        )
+        .order_by(EquipmentChange.changed_at, EquipmentChange.version)
+    )
+
+
+class ChangeNotifier:
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.connected = False
+        # последняя версия ленты, по которую кэши уже сброшены (None — неизвестна)
+        self._version: int | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="change-notifier")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def ticket(self) -> asyncio.Event:
+        """
+        Take before reading the table, then pass to `wait()`: a NOTIFY that
+        arrives between the read and the wait is not lost.
+        """
+        return self._event
+
+    async def wait(self, ticket: asyncio.Event, timeout: float) -> bool:
+        """Wait for a NOTIFY after `ticket`; False on timeout."""
+        if not self.connected:
+            timeout = min(timeout, FALLBACK_POLL_SECONDS)
+        try:
+            async with asyncio.timeout(timeout):
+                await ticket.wait()
+        except TimeoutError:
+            return False
+        return True
+
+    async def _resync(self) -> None:
+        # изменения, пропущенные без соединения, неизвестны: голову ленты читаем
+        # до сброса, всё закоммиченное после неё придёт следующими NOTIFY
+        try:
+            async with SessionLocal() as db:
+                self._version = await db.scalar(
+                    select(func.coalesce(func.max(EquipmentChange.version), 0))
+                )
+        except (DBAPIError, OSError) as e:
+            logger.warning("change feed: cannot read head version: %s", e)
+            self._version = None
+        await invalidate_equipment(None)
+        self._wake()
+
+    async def _changed(self) -> None:
+        # писатель мог быть не этим процессом (другой бэкенд, CLI, SQL) — кэш ответов
+        # сбрасываем по самой ленте, а не только в обработчиках записи
+        if self._version is None:
+            await self._resync()
+            return
+        stmt = (
+            select(EquipmentChange.version, EquipmentChange.equipment_id)
+            .where(EquipmentChange.version > self._version)
+            .order_by(EquipmentChange.version)
+            .limit(INVALIDATE_MAX_CHANGES + 1)
+        )
+        try:
+            async with SessionLocal() as db:
+                rows = (await db.execute(stmt)).all()
+        except (DBAPIError, OSError) as e:
+            logger.warning("change feed: cannot read changes: %s", e)
+            await self._resync()
+            return
+        if len(rows) > INVALIDATE_MAX_CHANGES:
+            await self._resync()
+            return
+        # пусто: строки этого NOTIFY уже прочитаны при разборе предыдущего
+        if rows:
+            self._version = rows[-1].version
+            await invalidate_equipment({str(row.equipment_id) for row in rows})
+        self._wake()
+
+    def _wake(self) -> None:
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    _listen_conninfo(), autocommit=True
+                ) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    self.connected = True
+                    delay = 1.0
+                    # изменения, пропущенные, пока соединения не было
+                    await self._resync()
+                    async for _ in conn.notifies():
+                        await self._changed()
+            except (psycopg.Error, OSError) as e:
+                logger.warning("change feed LISTEN failed, retry in %.0fs: %s", delay, e)
+            finally:
+                self.connected = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+notifier = ChangeNotifier()
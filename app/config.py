@@ -1,4 +1,6 @@
-from pydantic import Field
+from typing import Literal
+
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,6 +15,107 @@ class Settings(BaseSettings):
         description="SQLAlchemy-compatible DB URL",
     )
 
+    # воркеры API; `main.py serve --workers N` передаёт N дочерним процессам
+    workers: int = Field(default=1, ge=1)
+    # сколько секунд при остановке ждать активные запросы (long-poll/SSE прерываются)
+    shutdown_timeout: float = Field(default=30.0, gt=0)
+
+    # пул соединений (на один процесс)
+    db_pool_size: int = Field(default=10, ge=1, description="Persistent pool connections")
+    db_max_overflow: int = Field(default=10, ge=0, description="Extra connections under load")
+    db_pool_timeout: float = Field(default=10.0, gt=0, description="Seconds to wait for a conn")
+    db_pool_recycle: int = Field(
+        default=1800, description="Recycle connections older than N seconds (-1 = never)"
+    )
+    db_pool_pre_ping: bool = Field(
+        default=False,
+        description="Ping on every checkout (extra round-trip; enable behind flaky networks)",
+    )
+
+    # общий бюджет соединений API на все воркеры (0 — без ограничения); пул каждого
+    # воркера урезается до бюджета / workers. Держать ниже max_connections сервера
+    # с запасом на миграции, cron (`main.py notify`) и админские сессии
+    db_max_connections: int = Field(default=0, ge=0)
+
+    # прогрев при старте: столько соединений открыть заранее (0 — без прогрева)
+    db_warmup_connections: int = Field(default=2, ge=0)
+
+    # серверные таймауты сессии (мс, 0 = без ограничения)
+    db_statement_timeout_ms: int = Field(default=30_000, ge=0)
+    db_idle_in_transaction_timeout_ms: int = Field(default=60_000, ge=0)
+
+    # PgBouncer (transaction pooling): без server-side prepared statements и без
+    # startup-параметра `options` — таймауты тогда задаются на роли (ALTER ROLE ... SET)
+    db_pgbouncer: bool = False
+
+    # реплика только для чтения (hot standby): GET-списки, карточки, агрегаты и экспорт.
+    # При отставании больше db_replica_max_lag секунд (или недоступности) — чтение с primary
+    db_replica_url: str | None = None
+    db_replica_max_lag: float = Field(default=5.0, gt=0)
+    db_replica_check_interval: float = Field(default=2.0, gt=0)
+
+    # аудит изменений: пачка пишется при audit_batch_size записях или раз в audit_flush_interval
+    # секунд; очередь больше audit_queue_size — запись оборудования ждёт, пока аудит догонит
+    audit_batch_size: int = Field(default=500, ge=1)
+    audit_flush_interval: float = Field(default=1.0, gt=0)
+    audit_queue_size: int = Field(default=10_000, ge=1)
+
+    # локальное зеркало (SQLite) для бэкенда рядом с десктоп-клиентом: чтение работает без
+    # сети, запись при недоступной БД копится в очереди. Нужен extra `mirror` (aiosqlite)
+    mirror_path: str | None = None
+    mirror_sync_interval: float = Field(default=30.0, gt=0)
+    # запас назад от прошлой синхронизации: updated_at — время начала транзакции
+    mirror_sync_overlap: float = Field(default=300.0, ge=0)
+
+    # отдельное соединение для LISTEN ленты изменений; за PgBouncer (transaction pooling)
+    # LISTEN не работает — тогда нужен прямой URL к Postgres. По умолчанию database_url
+    db_listen_url: str | None = None
+
+    # статус "срок истекает": до следующей поверки не больше N дней
+    days_threshold: int = Field(default=14, ge=0)
+
+    # ежедневный поиск истекающих/просроченных поверок -> notification_outbox
+    notify_enabled: bool = True
+    notify_check_interval: float = Field(
+        default=3600.0, gt=0, description="Seconds between checks; the job itself runs once a day"
+    )
+
+    # профилирование: латентность по роутам и SQL-метрики в /metrics, поиск N+1
+    profiling_enabled: bool = True
+    # один и тот же SQL в одном запросе >= N раз — N+1 (предупреждение в лог и счётчик)
+    n_plus_one_threshold: int = Field(default=10, ge=2)
+    # лог медленных запросов, мс (0 — выключено); с EXPLAIN — план в том же сообщении
+    slow_query_ms: float = Field(default=500.0, ge=0)
+    slow_query_explain: bool = False
+
+    # кэш агрегатов GET /equipment/stats, секунды
+    stats_cache_ttl: float = Field(default=30.0, gt=0)
+    # LRU тел ответов GET /equipment и GET /equipment/{id} (записей на каждый кэш)
+    response_cache_size: int = Field(default=512, ge=1)
+    # их же срок жизни, секунды: обычно их сбрасывает NOTIFY equipment_changes (любой писатель
+    # в БД), TTL — страховка на время, пока LISTEN-соединения нет
+    response_cache_ttl: float = Field(default=60.0, gt=0)
+    # X-Total-Count (count=exact|estimated): память счётчиков, секунды (сбрасывается и записью)
+    count_cache_ttl: float = Field(default=60.0, gt=0)
+    # count=estimated: оценка планировщика меньше порога пересчитывается точным COUNT
+    count_estimate_threshold: int = Field(default=10_000, ge=0)
+    # false — кэши ответов, счётчиков и агрегатов выключены (бенчмарки: каждый запрос идёт в БД)
+    cache_enabled: bool = True
+    # каталог снимков метрик воркеров: /metrics любого воркера отдаёт сумму по всем
+    # (main.py serve с --workers > 1 создаёт его сам)
+    metrics_dir: str | None = None
+    # memory — кэш в процессе; sqlite — файл, общий для воркеров (инвалидация видна всем);
+    # auto — sqlite при workers > 1
+    cache_backend: Literal["auto", "memory", "sqlite"] = "auto"
+    cache_path: str | None = None  # по умолчанию — новый каталог 0700 во временном
+
+    @model_validator(mode="after")
+    def _single_worker_mirror(self):
+        # очередь записи зеркала повторяет один процесс — иначе каждый воркер отправит её заново
+        if self.mirror_path and self.workers > 1:
+            raise ValueError("mirror_path requires workers = 1")
+        return self
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
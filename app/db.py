@@ -1,7 +1,202 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import logging
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
+from .metrics import DB_SLOW_QUERIES, POOL_CHECKOUT_SECONDS, POOL_CHECKOUT_TIMEOUTS, Gauge
+from .profiling import record_query
+
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """QueuePool, который пишет время ожидания соединения в метрики."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+
+def selector_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop psycopg's async mode can run on. Windows defaults to ProactorEventLoop,
+    which psycopg refuses; uvicorn >= 0.36 takes this as `loop="app.db:selector_event_loop"`.
+    """
+    return asyncio.SelectorEventLoop()
+
+
+def _connect_args() -> dict:
+    if settings.db_pgbouncer:
+        # prepare_threshold=None: psycopg не создаёт server-side prepared statements
+        return {"prepare_threshold": None}
+
+    options = []
+    if settings.db_statement_timeout_ms:
+        options.append(f"-c statement_timeout={settings.db_statement_timeout_ms}")
+    if settings.db_idle_in_transaction_timeout_ms:
+        options.append(
+            f"-c idle_in_transaction_session_timeout={settings.db_idle_in_transaction_timeout_ms}"
+        )
+    return {"options": " ".join(options)} if options else {}
+
+
+def pool_limits(workers: int) -> tuple[int, int]:
+    """(pool_size, max_overflow) of one worker so that all workers fit db_max_connections."""
+    pool_size, max_overflow = settings.db_pool_size, settings.db_max_overflow
+    if not settings.db_max_connections:
+        return pool_size, max_overflow
+    # у каждого воркера ещё одно соединение вне пула — LISTEN ленты изменений
+    per_worker = settings.db_max_connections // workers - 1
+    if per_worker < 1:
+        raise ValueError(
+            f"db_max_connections={settings.db_max_connections} is too small for {workers} workers"
+            f" (need at least {2 * workers})"
+        )
+    pool_size = min(pool_size, per_worker)
+    return pool_size, min(max_overflow, per_worker - pool_size)
+
+
+# expire_on_commit=False: после commit атрибуты не перечитываются (lazy IO в async недоступен).
+# bind появляется в get_engine(): импорт app.* не создаёт engine и не тянет драйвер
+SessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+# сессии чтения с реплики (db_replica_url); info["replica"] видят обработчики
+ReplicaSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False, info={"replica": True}
+)
+
+_engine: AsyncEngine | None = None
+_replica_engine: AsyncEngine | None = None
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    pool_size, max_overflow = pool_limits(settings.workers)
+    # psycopg3 в async-режиме: тот же URL postgresql+psycopg://, драйвер выбирает SQLAlchemy
+    engine = create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args=_connect_args(),
+    )
+    if settings.profiling_enabled:
+        event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """Create the engine on first use (app lifespan, CLI) and bind SessionLocal to it."""
+    global _engine  # noqa: PLW0603
+    if _engine is None:
+        _engine = _create_engine(settings.database_url)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_replica_engine() -> AsyncEngine | None:
+    """Engine of the read replica (None without db_replica_url); binds ReplicaSessionLocal."""
+    global _replica_engine  # noqa: PLW0603
+    if _replica_engine is None and settings.db_replica_url:
+        _replica_engine = _create_engine(settings.db_replica_url)
+        ReplicaSessionLocal.configure(bind=_replica_engine)
+    return _replica_engine
+
+
+async def dispose_engine() -> None:
+    global _engine, _replica_engine  # noqa: PLW0603
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+    if _replica_engine is not None:
+        await _replica_engine.dispose()
+        _replica_engine = None
+
+
+async def prefill_pool(n: int) -> None:
+    """Open `n` pooled connections up front, so first requests do not pay for connect/auth."""
+
+    async def _open() -> None:
+        async with get_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # одновременно: иначе пул раз за разом отдаёт одно и то же соединение
+    await asyncio.gather(*(_open() for _ in range(n)))
+
+
+# engine.pool пересоздаётся при dispose(), поэтому читаем его на каждый scrape
+def _pool_checked_out() -> float:
+    return _engine.pool.checkedout() if _engine is not None else 0
+
+
+def _pool_overflow() -> float:
+    return _engine.pool.overflow() if _engine is not None else 0
+
+
+Gauge(
+    "metrology_db_pool_checked_out",
+    "DB connections currently checked out from the pool",
+    _pool_checked_out,
+)
+Gauge(
+    "metrology_db_pool_overflow",
+    "Overflow connections currently open (negative = spare pool slots)",
+    _pool_overflow,
+)
+
+
+# -----------------------------
+# Профилирование SQL
+# -----------------------------
+# сигнатуры задаёт SQLAlchemy; старт храним в execution context (свой на каждый execute,
+# при ошибке выполнения просто отбрасывается)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913, PLR0917
+    context.query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913, PLR0917
+    elapsed = time.perf_counter() - context.query_start
+    record_query(statement, elapsed)
+
+    if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+        DB_SLOW_QUERIES.inc()
+        plan = ""
+        if settings.slow_query_explain and not executemany:
+            plan = "\n" + _explain(conn, statement, parameters)
+        logger.warning("slow query %.0f ms: %s%s", elapsed * 1000, statement, plan)
+
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+def _explain(conn, statement: str, parameters) -> str:
+    """
+    EXPLAIN (без ANALYZE — запрос не выполняется повторно) на том же соединении,
+    отдельным курсором (результат исходного ещё не прочитан) и в SAVEPOINT, чтобы
+    ошибка EXPLAIN не сломала транзакцию запроса.
+    """
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return "(EXPLAIN skipped: not a SELECT)"
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            plan = f"(EXPLAIN failed: {e})"
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
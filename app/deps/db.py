@@ -1,13 +1,33 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import SessionLocal
+from ..mirror import local_read_session
+from ..replica import read_session
 
 
-def get_db() -> Generator[Session]:
+async def get_db() -> AsyncGenerator[AsyncSession]:
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession]:
+    """Read-only handlers: the replica while its lag is acceptable, else the primary."""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_local_db() -> AsyncGenerator[AsyncSession]:
+    """Lists and cards: the local mirror when it is enabled and synced, else as get_read_db."""
+    db = local_read_session()
+    try:
+        yield db
+    finally:
+        await db.close()
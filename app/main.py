@@ -1,12 +1,35 @@
 # app/main.py
+"""
+App factory: `uvicorn --factory app.main:create_app`.
+
+`app.main:app` still works (built on first access). The engine is created in
+the lifespan, not at import, followed by a warm-up: pool prefill and one run of
+the prebuilt statements, so the first requests do not pay for connect/compile.
+"""
+
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
 
-from .api.equipment import router as equipment_router
+from . import metrics
+from .api.equipment import prime_statements, router as equipment_router
+from .api.equipment_changes import router as equipment_changes_router
+from .api.equipment_io import router as equipment_io_router
+from .audit import audit
+from .changes import notifier
 from .config import settings
+from .db import SessionLocal, dispose_engine, get_engine, get_replica_engine, prefill_pool
+from .mirror import mirror
+from .notifications import scheduler
+from .profiling import ProfilingMiddleware
+from .replica import replica
 
-app = FastAPI(title=settings.app_name, version=settings.version)
-
+logger = logging.getLogger(__name__)
 
 origins = [
     "http://localhost:5173",
@@ -16,17 +39,103 @@ origins = [
     "tauri://localhost",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=False,  # creds не нужны; можно оставить True при необходимости
-    allow_methods=["*"],  # разрешаем OPTIONS/POST/PATCH/DELETE/GET
-    allow_headers=["*"],  # Content-Type, Authorization и пр.
-)
 
-app.include_router(equipment_router)
+async def warm_up() -> None:
+    start = time.perf_counter()
+    try:
+        await prefill_pool(min(settings.db_warmup_connections, get_engine().pool.size()))
+        async with SessionLocal() as db:
+            await prime_statements(db)
+    except (OSError, SQLAlchemyError) as e:
+        # БД ещё не поднята — не мешаем старту, соединения откроются по запросу
+        logger.warning("warm-up skipped: %s", e)
+        return
+    logger.info("warm-up done in %.0f ms", (time.perf_counter() - start) * 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_engine()
+    # аудит пишется пачками в фоне; при остановке очередь дописывается до dispose
+    audit.start()
+    if settings.db_warmup_connections:
+        await warm_up()
+    # без реплики чтение идёт на primary; монитор решает, можно ли читать с реплики
+    if get_replica_engine() is not None:
+        replica.start()
+    # зеркало: прошлый снимок читается сразу, синхронизация и очередь записи — в фоне
+    if settings.mirror_path:
+        mirror.start()
+    # несколько воркеров: метрики процесса — в общий каталог, /metrics суммирует
+    if settings.metrics_dir:
+        metrics.snapshots.start(settings.metrics_dir)
+    # LISTEN для ленты изменений; без БД переподключается в фоне, старт не блокирует
+    notifier.start()
+    # в нескольких воркерах job всё равно выполнит один (advisory lock)
+    if settings.notify_enabled:
+        scheduler.start()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        await notifier.stop()
+        await mirror.stop()
+        await replica.stop()
+        await audit.stop()
+        await dispose_engine()
+        await metrics.snapshots.stop()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title=settings.app_name, version=settings.version, lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=False,  # creds не нужны; можно оставить True при необходимости
+        allow_methods=["*"],  # разрешаем OPTIONS/POST/PATCH/DELETE/GET
+        allow_headers=["*"],  # Content-Type, Authorization и пр.
+        # иначе WebView не отдаст заголовок в fetch()
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Mode", "ETag"],
+    )
+
+    if settings.profiling_enabled:
+        # последним: снаружи CORS, время запроса — целиком
+        app.add_middleware(ProfilingMiddleware)
+
+    # io-роуты (/equipment/bulk, /equipment/changes, ...) — раньше CRUD,
+    # иначе их перехватит /equipment/{equipment_id}
+    app.include_router(equipment_io_router)
+    app.include_router(equipment_changes_router)
+    app.include_router(equipment_router)
+
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/mirror", mirror_status, methods=["GET"])
+    app.add_api_route(
+        "/metrics",
+        get_metrics,
+        methods=["GET"],
+        response_class=PlainTextResponse,
+        include_in_schema=False,
+    )
+    return app
 
 
-@app.get("/")
 def root():
     return {"app": settings.app_name, "version": settings.version}
+
+
+async def mirror_status():
+    return await mirror.status()
+
+
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` без --factory: приложение собирается при первом обращении
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,344 @@
+# app/metrics.py
+"""
+Минимальные метрики в текстовом формате Prometheus (без внешних зависимостей).
+
+Histogram/Counter хранят значения в памяти процесса, Gauge читается через
+callback в момент выдачи `/metrics`.
+
+Несколько воркеров (`main.py serve --workers N`): каждый раз в SNAPSHOT_INTERVAL
+секунд пишет свои значения в `<metrics_dir>/<pid>.json`; `/metrics` любого
+воркера отдаёт сумму Counter/Histogram по всем файлам (свои — текущие, чужие —
+не старше интервала) и Gauge каждого живого воркера под меткой `worker="<pid>"`.
+Файлы остановленных воркеров остаются: счётчики не откатываются назад.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# секунды: от 1 мс до 10 с
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+SNAPSHOT_INTERVAL = 5.0  # с
+# Gauge воркера, не писавшего снимок дольше, не выводим (процесс умер без stop)
+GAUGE_STALE_AFTER = 3 * SNAPSHOT_INTERVAL
+
+
+def _fmt_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._values: dict[LabelValues, float] = {} if labelnames else {(): 0.0}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    @staticmethod
+    def merge(snapshots: list[list]) -> dict[LabelValues, float]:
+        merged: dict[LabelValues, float] = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot:
+                key = tuple(labels)
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+    def render(self, values: dict[LabelValues, float] | None = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {_fmt_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> (counts по бакетам, sum, count)
+        self._values: dict[LabelValues, tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total, n = self._values.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[labels] = (counts, total + value, n + 1)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                [list(labels), list(counts), total, n]
+                for labels, (counts, total, n) in self._values.items()
+            ]
+
+    def merge(self, snapshots: list[list]) -> dict[LabelValues, tuple[list[int], float, int]]:
+        merged: dict[LabelValues, tuple[list[int], float, int]] = {}
+        for snapshot in snapshots:
+            for labels, counts, total, n in snapshot:
+                key = tuple(labels)
+                acc_counts, acc_total, acc_n = merged.get(key) or ([0] * len(self.buckets), 0.0, 0)
+                merged[key] = (
+                    [a + b for a, b in zip(acc_counts, counts, strict=True)],
+                    acc_total + total,
+                    acc_n + n,
+                )
+        return merged
+
+    def render(
+        self, values: dict[LabelValues, tuple[list[int], float, int]] | None = None
+    ) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        if values is None:
+            with self._lock:
+                values = {labels: (list(c), t, n) for labels, (c, t, n) in self._values.items()}
+        for labels, (counts, total, n) in sorted(values.items()):
+            for bound, c in zip(self.buckets, counts, strict=True):
+                le = _fmt_labels(self.labelnames, labels, f'le="{_fmt_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {c}")
+            inf = _fmt_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {n}")
+            lbl = _fmt_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{lbl} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{lbl} {n}")
+        return lines
+
+
+class Gauge:
+    """Gauge, значение которого вычисляется при выдаче метрик."""
+
+    def __init__(self, name: str, doc: str, fn: Callable[[], float]) -> None:
+        self.name = name
+        self.doc = doc
+        self.fn = fn
+        REGISTRY.append(self)
+
+    def snapshot(self) -> float:
+        return self.fn()
+
+    def render(self, values: dict[str, float] | None = None) -> list[str]:
+        """`values`: pid воркера -> значение (несколько воркеров), иначе своё."""
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        if values is None:
+            lines.append(f"{self.name} {_fmt_value(self.fn())}")
+            return lines
+        for pid, value in sorted(values.items()):
+            lines.append(f'{self.name}{{worker="{pid}"}} {_fmt_value(value)}')
+        return lines
+
+
+REGISTRY: list[Counter | Histogram | Gauge] = []
+
+
+def _snapshot(with_gauges: bool = True) -> dict:
+    return {
+        "time": time.time(),
+        "metrics": {
+            m.name: m.snapshot() for m in REGISTRY if with_gauges or not isinstance(m, Gauge)
+        },
+    }
+
+
+class Snapshots:
+    """Periodic dump of this worker's metrics into the directory shared by all workers."""
+
+    def __init__(self) -> None:
+        self.directory: Path | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self, directory: str) -> None:
+        if self._task is None:
+            self.directory = Path(directory)
+            self._task = asyncio.create_task(self._run(), name="metrics-snapshots")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        # последний снимок без Gauge: счётчики остаются в сумме, соединений процесса уже нет
+        try:
+            self.write(with_gauges=False)
+        except OSError as e:
+            logger.warning("metrics snapshot failed: %s", e)
+        self.directory = None
+
+    def write(self, with_gauges: bool = True) -> None:
+        # запись через временный файл: читатель не увидит половину JSON
+        tmp = self.directory / f".{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(_snapshot(with_gauges)), "utf-8")
+        os.replace(tmp, self.directory / f"{os.getpid()}.json")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning("metrics snapshot failed: %s", e)
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+    def read(self) -> dict[str, dict]:
+        """pid -> snapshot of every worker, this one up to date."""
+        result: dict[str, dict] = {}
+        for path in self.directory.glob("*.json"):
+            with contextlib.suppress(OSError, ValueError):
+                result[path.stem] = json.loads(path.read_text("utf-8"))
+        result[str(os.getpid())] = _snapshot()
+        return result
+
+
+snapshots = Snapshots()
+
+
+def _render_merged() -> list[str]:
+    workers = snapshots.read()
+    fresh_after = time.time() - GAUGE_STALE_AFTER
+    lines: list[str] = []
+    for metric in REGISTRY:
+        found = {
+            pid: s["metrics"][metric.name]
+            for pid, s in workers.items()
+            if metric.name in s["metrics"]
+        }
+        if isinstance(metric, Gauge):
+            lines.extend(
+                metric.render(
+                    {pid: v for pid, v in found.items() if workers[pid]["time"] >= fresh_after}
+                )
+            )
+        else:
+            lines.extend(metric.render(metric.merge(list(found.values()))))
+    return lines
+
+
+def render() -> str:
+    if snapshots.directory is not None:
+        lines = _render_merged()
+    else:
+        lines = []
+        for metric in REGISTRY:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Пул соединений БД
+# -----------------------------
+POOL_CHECKOUT_SECONDS = Histogram(
+    "metrology_db_pool_checkout_seconds",
+    "Time spent waiting for a pooled DB connection (incl. opening overflow connections)",
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "metrology_db_pool_checkout_timeouts_total",
+    "Pool checkouts that failed with a timeout",
+)
+
+
+# -----------------------------
+# HTTP / SQL (app/profiling.py, события engine в app/db.py)
+# -----------------------------
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "metrology_http_request_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+DB_QUERY_SECONDS = Histogram(
+    "metrology_db_query_seconds",
+    "SQL statement execution time (cursor.execute, without fetching)",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "metrology_db_queries_per_request",
+    "SQL statements executed while handling one request",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "metrology_db_seconds_per_request",
+    "Total SQL execution time per request",
+    ("method", "route"),
+)
+DB_N_PLUS_ONE = Counter(
+    "metrology_db_n_plus_one_total",
+    "Requests that ran the same statement at least n_plus_one_threshold times",
+    ("method", "route"),
+)
+DB_SLOW_QUERIES = Counter(
+    "metrology_db_slow_queries_total",
+    "SQL statements slower than slow_query_ms",
+)
+
+
+# -----------------------------
+# Реплика чтения (app/replica.py)
+# -----------------------------
+DB_REPLICA_FALLBACK_READS = Counter(
+    "metrology_db_replica_fallback_reads_total",
+    "Read sessions sent to the primary because the replica lags or is unavailable",
+)
+
+
+# -----------------------------
+# Аудит (app/audit.py)
+# -----------------------------
+AUDIT_FLUSH_ERRORS = Counter(
+    "metrology_audit_flush_errors_total",
+    "Failed attempts to write a batch of audit entries",
+)
+AUDIT_ENTRIES_DROPPED = Counter(
+    "metrology_audit_entries_dropped_total",
+    "Audit entries given up after all retries or left unwritten at shutdown (logged as JSON)",
+)
@@ -0,0 +1,556 @@
+# app/mirror.py
+"""
+Local mirror for a backend bundled with the desktop client (METROLOGY_MIRROR_PATH).
+
+An SQLite copy of equipment + verification (+ equipment_archive) serves list, search, detail, stats
+and export through `local_read_session()`; the shared queries of
+app/api/equipment.py compile for SQLite (app/sqlcompat.py), so the status is
+computed by the same STATUS_EXPR against the workstation's local date.
+
+Sync: a full snapshot on the first run, then every `mirror_sync_interval`
+seconds only rows with updated_at >= previous sync start - `mirror_sync_overlap`
+plus tombstones (equipment_change, op='delete') and archived rows (archived_at)
+from the same moment. The
+overlap covers transactions that were still running during the previous sync:
+updated_at is the transaction start time.
+
+Writes still go to the central database. When it is unreachable, a write
+handler decorated with `queue_when_offline` stores its arguments in the
+write_queue table and answers 202; the queue is replayed in order before each
+sync and before any new write, so an old queued PATCH never lands on top of a
+newer edit (while the database stays down, new writes join the queue). Only a
+failure before COMMIT is queued: once the commit has been sent the outcome is
+unknown, and a replay could duplicate the row, so the client gets 503. A
+replayed write rejected by the server (HTTPException: unique number, missing
+row) or failing with an SQL error (timeout, deadlock, constraint) stays in the
+queue with last_error and is not retried; the replay goes on with the next one.
+Only a lost connection stops it.
+
+Meant for a single local process: the queue is replayed by the process that
+owns the file (mirror_path requires workers = 1).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import typing
+import uuid
+from datetime import datetime, timedelta
+
+import psycopg
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, event, func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+
+from .cache import invalidate_equipment
+from .changes import tombstones
+from .config import settings
+from .db import SessionLocal
+from .models.equipment import Equipment
+from .models.equipment_archive import EquipmentArchive
+from .models.verification import Verification
+from .replica import read_session
+
+logger = logging.getLogger(__name__)
+
+# типы колонок — как их хранит SQLAlchemy в SQLite (UUID — 32 hex-символа)
+MIRROR_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS equipment (
+        id CHAR(32) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        type VARCHAR(100) NOT NULL,
+        serial_number VARCHAR(100) NOT NULL,
+        inventory_number VARCHAR(100) NOT NULL,
+        state VARCHAR(20) NOT NULL,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_equipment_name_id ON equipment (name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_equipment_state ON equipment (state)",
+    "CREATE INDEX IF NOT EXISTS ix_equipment_type ON equipment (type)",
+    """
+    CREATE TABLE IF NOT EXISTS verification (
+        id CHAR(32) PRIMARY KEY,
+        equipment_id CHAR(32) NOT NULL UNIQUE,
+        verification_date DATE NOT NULL,
+        interval_months INTEGER NOT NULL,
+        next_verification_date DATE
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_verification_next_verification_date
+        ON verification (next_verification_date)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS equipment_archive (
+        id CHAR(32) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        type VARCHAR(100) NOT NULL,
+        serial_number VARCHAR(100) NOT NULL,
+        inventory_number VARCHAR(100) NOT NULL,
+        state VARCHAR(20) NOT NULL,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        archived_at DATETIME NOT NULL,
+        verification_date DATE,
+        interval_months INTEGER,
+        next_verification_date DATE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_equipment_archive_name_id ON equipment_archive (name, id)",
+    "CREATE TABLE IF NOT EXISTS mirror_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS write_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        args TEXT NOT NULL,
+        queued_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_error TEXT
+    )
+    """,
+)
+
+SYNC_CHUNK_ROWS = 2000
+SYNC_STATE_KEY = "synced_from"  # начало последней успешной синхронизации (время сервера)
+COMMIT_STARTED = "commit_started"  # ключ Session.info: COMMIT уже отправлен
+
+MIRROR_COLUMNS = (
+    Equipment.id,
+    Equipment.name,
+    Equipment.type,
+    Equipment.serial_number,
+    Equipment.inventory_number,
+    Equipment.state,
+    Equipment.created_at,
+    Equipment.updated_at,
+    Verification.id.label("verification_id"),
+    Verification.verification_date,
+    Verification.interval_months,
+    Verification.next_verification_date,
+)
+
+# сессии чтения с зеркала; bind — в Mirror.start()
+MirrorSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False, info={"mirror": True}
+)
+
+
+def _on_connect(dbapi_conn, _record) -> None:
+    # встроенный lower() SQLite знает только ASCII — поиск `q` по кириллице без него не работает
+    dbapi_conn.create_function("lower", 1, str.lower, deterministic=True)
+    dbapi_conn.execute("PRAGMA journal_mode=WAL")
+    dbapi_conn.execute("PRAGMA synchronous=NORMAL")
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_commit_started(session: Session) -> None:
+    # после этой точки обрыв связи не значит «не записано» — в очередь такое не ставим
+    session.info[COMMIT_STARTED] = True
+
+
+def is_offline_error(e: BaseException) -> bool:
+    """Connection to the central database failed or dropped (not an SQL error or timeout)."""
+    if isinstance(e, DBAPIError):
+        return e.connection_invalidated or type(e.orig) is psycopg.OperationalError
+    return isinstance(e, OSError)
+
+
+class Mirror:
+    def __init__(self) -> None:
+        self.engine: AsyncEngine | None = None
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._replay_lock = asyncio.Lock()
+        self.ready = False  # есть хотя бы один полный снимок
+        self.queued = 0  # записи в write_queue, ждущие повтора (без last_error)
+        self.synced_from: datetime | None = None
+
+    def start(self) -> None:
+        if self._task is not None or not settings.mirror_path:
+            return
+        # aiosqlite — optional-зависимость: `uv sync --extra mirror`
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{settings.mirror_path}")
+        event.listen(self.engine.sync_engine, "connect", _on_connect)
+        MirrorSessionLocal.configure(bind=self.engine)
+        self._task = asyncio.create_task(self._run(), name="mirror-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+        self.ready = False
+
+    async def _init(self) -> None:
+        async with self.engine.begin() as conn:
+            for ddl in MIRROR_SCHEMA:
+                await conn.execute(text(ddl))
+            value = await conn.scalar(
+                text("SELECT value FROM mirror_state WHERE key = :key"), {"key": SYNC_STATE_KEY}
+            )
+            self.queued = await conn.scalar(
+                text("SELECT count(*) FROM write_queue WHERE last_error IS NULL")
+            )
+        # снимок прошлого запуска: отдаём его сразу, даже если центральная БД недоступна
+        self.synced_from = datetime.fromisoformat(value) if value else None
+        self.ready = self.synced_from is not None
+
+    async def _run(self) -> None:
+        await self._init()
+        while True:
+            try:
+                await self.replay()
+                await self.sync()
+            except Exception as e:
+                if not is_offline_error(e):
+                    logger.exception("mirror sync failed")
+                else:
+                    logger.warning("mirror: central database unavailable: %s", e)
+            await asyncio.sleep(settings.mirror_sync_interval)
+
+    # -----------------------------
+    # Синхронизация
+    # -----------------------------
+    async def sync(self) -> int:
+        """Pull changes from the central database; returns the number of rows applied."""
+        async with self._lock:
+            since = self.synced_from
+            if since is not None:
+                since -= timedelta(seconds=settings.mirror_sync_overlap)
+
+            stmt = select(*MIRROR_COLUMNS).join(
+                Verification, Verification.equipment_id == Equipment.id, isouter=True
+            )
+            # списанные приборы: строка уходит из equipment (tombstone) и появляется тут
+            archived = select(*EquipmentArchive.__table__.c)
+            if since is not None:
+                stmt = stmt.where(Equipment.updated_at >= since)
+                archived = archived.where(EquipmentArchive.archived_at >= since)
+
+            changed: list = []
+            async with SessionLocal() as central, MirrorSessionLocal() as local:
+                # now() — начало транзакции; всё, что закоммичено позже, попадёт в следующий раз
+                started = await central.scalar(select(func.now()))
+                if since is None:
+                    # полный снимок: строки, удалённые до него, в зеркале не нужны
+                    await local.execute(delete(Verification))
+                    await local.execute(delete(Equipment))
+                    await local.execute(delete(EquipmentArchive))
+                    deleted = []
+                else:
+                    deleted = (await central.scalars(tombstones(since))).all()
+
+                result = await central.stream(stmt.execution_options(yield_per=SYNC_CHUNK_ROWS))
+                async for partition in result.partitions():
+                    await _upsert(local, partition)
+                    changed.extend(row.id for row in partition)
+                if deleted:
+                    await _delete(local, deleted)
+                result = await central.stream(archived.execution_options(yield_per=SYNC_CHUNK_ROWS))
+                async for partition in result.partitions():
+                    await _archive(local, partition)
+
+                await local.execute(
+                    text(
+                        "INSERT INTO mirror_state (key, value) VALUES (:key, :value)"
+                        " ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+                    ),
+                    {"key": SYNC_STATE_KEY, "value": started.isoformat()},
+                )
+                await local.commit()
+
+            first = self.synced_from is None
+            self.synced_from = started
+            self.ready = True
+            if first:
+                await invalidate_equipment(None)
+            elif changed or deleted:
+                await invalidate_equipment([*changed, *deleted])
+            return len(changed) + len(deleted)
+
+    # -----------------------------
+    # Очередь записи
+    # -----------------------------
+    async def enqueue(self, op: str, args: dict) -> int:
+        async with MirrorSessionLocal() as local:
+            result = await local.execute(
+                text("INSERT INTO write_queue (op, args) VALUES (:op, :args) RETURNING id"),
+                {"op": op, "args": json.dumps(args, ensure_ascii=False)},
+            )
+            queue_id = result.scalar_one()
+            await local.commit()
+        self.queued += 1
+        logger.info("mirror: central database unavailable, %s queued as #%d", op, queue_id)
+        return queue_id
+
+    async def replay(self) -> int:
+        """Send queued writes in order; stops at the first connection failure."""
+        # повтор из фонового цикла и из обработчика записи не должен идти параллельно
+        async with self._replay_lock, MirrorSessionLocal() as local:
+            queued = (
+                await local.execute(
+                    text(
+                        "SELECT id, op, args FROM write_queue WHERE last_error IS NULL ORDER BY id"
+                    )
+                )
+            ).all()
+
+            done = 0
+            for queue_id, op, args in queued:
+                handler = WRITE_HANDLERS[op]
+                error = None
+                central = SessionLocal()
+                try:
+                    async with central:
+                        await handler.call(central, json.loads(args))
+                except HTTPException as e:
+                    error = str(e.detail)
+                    logger.warning("mirror: queued %s #%d rejected: %s", op, queue_id, error)
+                except (DBAPIError, OSError) as e:
+                    if not is_offline_error(e):
+                        # ошибка SQL (таймаут, deadlock, конфликт с параллельной правкой):
+                        # в голове очереди она остановила бы все следующие повторы
+                        error = str(e.orig if isinstance(e, DBAPIError) else e)
+                    elif central.info.get(COMMIT_STARTED):
+                        # исход неизвестен: повтор мог бы задвоить запись — на ручную проверку
+                        error = f"connection lost during commit, check manually: {e}"
+                    else:
+                        raise
+                    logger.warning("mirror: queued %s #%d failed: %s", op, queue_id, error)
+
+                if error is None:
+                    await local.execute(
+                        text("DELETE FROM write_queue WHERE id = :id"), {"id": queue_id}
+                    )
+                    done += 1
+                else:
+                    await local.execute(
+                        text("UPDATE write_queue SET last_error = :error WHERE id = :id"),
+                        {"id": queue_id, "error": error},
+                    )
+                await local.commit()
+                self.queued -= 1
+            return done
+
+    async def status(self) -> dict:
+        """Sync state and the write queue; failed items keep their arguments for a manual retry."""
+        result = {
+            "enabled": self.engine is not None,
+            "ready": self.ready,
+            "synced_from": self.synced_from,
+            "queued": 0,
+            "failed": [],
+        }
+        if self.engine is None:
+            return result
+        async with MirrorSessionLocal() as local:
+            result["queued"] = await local.scalar(
+                text("SELECT count(*) FROM write_queue WHERE last_error IS NULL")
+            )
+            failed = (
+                await local.execute(
+                    text(
+                        "SELECT id, op, args, queued_at, last_error FROM write_queue"
+                        " WHERE last_error IS NOT NULL ORDER BY id"
+                    )
+                )
+            ).mappings()
+            result["failed"] = [{**row, "args": json.loads(row["args"])} for row in failed]
+        return result
+
+
+async def _upsert(local: AsyncSession, rows) -> None:
+    eq = sqlite_insert(Equipment)
+    await local.execute(
+        eq.on_conflict_do_update(
+            index_elements=[Equipment.id],
+            set_={
+                col: eq.excluded[col]
+                for col in (
+                    "name",
+                    "type",
+                    "serial_number",
+                    "inventory_number",
+                    "state",
+                    "created_at",
+                    "updated_at",
+                )
+            },
+        ),
+        [
+            {
+                "id": r.id,
+                "name": r.name,
+                "type": r.type,
+                "serial_number": r.serial_number,
+                "inventory_number": r.inventory_number,
+                "state": r.state,
+                "created_at": r.created_at,
+                "updated_at": r.updated_at,
+            }
+            for r in rows
+        ],
+    )
+
+    # verification: строка есть — upsert по equipment_id, нет — удалить локальную
+    with_verification = [r for r in rows if r.verification_id is not None]
+    if with_verification:
+        ver = sqlite_insert(Verification)
+        await local.execute(
+            ver.on_conflict_do_update(
+                index_elements=[Verification.equipment_id],
+                set_={
+                    col: ver.excluded[col]
+                    for col in (
+                        "id",
+                        "verification_date",
+                        "interval_months",
+                        "next_verification_date",
+                    )
+                },
+            ),
+            [
+                {
+                    "id": r.verification_id,
+                    "equipment_id": str(r.id),
+                    "verification_date": r.verification_date,
+                    "interval_months": r.interval_months,
+                    "next_verification_date": r.next_verification_date,
+                }
+                for r in with_verification
+            ],
+        )
+    without = [str(r.id) for r in rows if r.verification_id is None]
+    if without:
+        await local.execute(delete(Verification).where(Verification.equipment_id.in_(without)))
+    # строка, возвращённая из архива, больше не списана
+    await local.execute(
+        delete(EquipmentArchive).where(EquipmentArchive.id.in_([r.id for r in rows]))
+    )
+
+
+async def _delete(local: AsyncSession, ids: list[str]) -> None:
+    for start in range(0, len(ids), SYNC_CHUNK_ROWS):
+        chunk = ids[start : start + SYNC_CHUNK_ROWS]
+        await local.execute(delete(Verification).where(Verification.equipment_id.in_(chunk)))
+        uuids = [uuid.UUID(i) for i in chunk]
+        await local.execute(delete(Equipment).where(Equipment.id.in_(uuids)))
+        # удалённый из архива — тоже через equipment (restore_archived), с tombstone
+        await local.execute(delete(EquipmentArchive).where(EquipmentArchive.id.in_(uuids)))
+
+
+async def _archive(local: AsyncSession, rows) -> None:
+    arc = sqlite_insert(EquipmentArchive)
+    await local.execute(
+        arc.on_conflict_do_update(
+            index_elements=[EquipmentArchive.id],
+            set_={
+                col.name: arc.excluded[col.name]
+                for col in EquipmentArchive.__table__.c
+                if not col.primary_key
+            },
+        ),
+        [row._asdict() for row in rows],
+    )
+
+
+mirror = Mirror()
+
+
+def local_read_session() -> AsyncSession:
+    """Mirror session once the mirror has a snapshot; otherwise replica/primary."""
+    if mirror.ready:
+        return MirrorSessionLocal()
+    return read_session()
+
+
+# -----------------------------
+# Запись при недоступной центральной БД
+# -----------------------------
+class _WriteHandler:
+    """A write endpoint whose arguments can be stored as JSON and replayed."""
+
+    def __init__(self, fn) -> None:
+        self.fn = fn
+        hints = typing.get_type_hints(fn)
+        self.adapters = {
+            name: TypeAdapter(hints[name]) for name in hints if name not in {"db", "return"}
+        }
+
+    def dump(self, kwargs: dict) -> dict:
+        # exclude_unset: PATCH при повторе меняет ровно те поля, что прислал клиент
+        return {
+            name: adapter.dump_python(kwargs[name], mode="json", exclude_unset=True)
+            for name, adapter in self.adapters.items()
+        }
+
+    async def call(self, db: AsyncSession, args: dict):
+        kwargs = {name: self.adapters[name].validate_python(value) for name, value in args.items()}
+        return await self.fn(**kwargs, db=db)
+
+
+WRITE_HANDLERS: dict[str, _WriteHandler] = {}
+
+
+def queue_when_offline(fn):
+    """
+    Decorator for write endpoints taking JSON-serializable arguments and `db`.
+    In mirror mode a connection failure queues the write (202) and a successful
+    write pulls the change into the mirror before answering.
+    """
+    handler = WRITE_HANDLERS[fn.__name__] = _WriteHandler(fn)
+
+    async def enqueue(kwargs: dict) -> JSONResponse:
+        queue_id = await mirror.enqueue(fn.__name__, handler.dump(kwargs))
+        return JSONResponse({"queued": queue_id}, status_code=202)
+
+    @functools.wraps(fn)
+    async def wrapper(**kwargs):
+        if not mirror.ready:
+            return await fn(**kwargs)
+        if mirror.queued:
+            # сначала более ранние записи из очереди: иначе повтор старого PATCH затрёт новую
+            try:
+                await mirror.replay()
+            except (DBAPIError, OSError) as e:
+                if not is_offline_error(e):
+                    raise
+            if mirror.queued:
+                return await enqueue(kwargs)
+        try:
+            response = await fn(**kwargs)
+        except (DBAPIError, OSError) as e:
+            if not is_offline_error(e):
+                raise
+            if kwargs["db"].info.get(COMMIT_STARTED):
+                raise HTTPException(
+                    status_code=503,
+                    detail="Connection lost during commit; the change may have been saved",
+                ) from e
+            return await enqueue(kwargs)
+        # свои записи видны в локальных списках сразу, без ожидания интервала
+        with contextlib.suppress(DBAPIError, OSError):
+            await mirror.sync()
+        return response
+
+    return wrapper
@@ -1,6 +1,21 @@
 # app/models/__init__.py
+from .audit import EquipmentAudit
 from .base import Base
 from .equipment import Equipment
+from .equipment_archive import EquipmentArchive
+from .equipment_change import EquipmentChange
+from .notification import JobWatermark, NotificationOutbox
 from .verification import Verification
+from .verification_history import VerificationHistory
 
-__all__ = ["Base", "Equipment", "Verification"]
+__all__ = [
+    "Base",
+    "Equipment",
+    "EquipmentArchive",
+    "EquipmentAudit",
+    "EquipmentChange",
+    "JobWatermark",
+    "NotificationOutbox",
+    "Verification",
+    "VerificationHistory",
+]
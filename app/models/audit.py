@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, CheckConstraint, DateTime, Identity, Index, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+AUDIT_ACTIONS = ("create", "update", "delete")
+
+
+class EquipmentAudit(Base):
+    """
+    Append-only audit trail: who changed what, with before/after values.
+
+    Written in batches by app/audit.py (AuditWriter), never updated. Partitioned
+    by month on changed_at (partitions equipment_audit_yYYYYmMM are created on
+    demand by equipment_audit_ensure_partition()), so old months can be detached
+    or dropped without a long DELETE.
+    """
+
+    __tablename__ = "equipment_audit"
+
+    # партиционированная таблица: ключ партиции обязан входить в первичный ключ
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+
+    # без FK: аудит переживает удаление оборудования
+    equipment_id: Mapped[str] = mapped_column(UUID(as_uuid=False), nullable=False)
+
+    action: Mapped[str] = mapped_column(String(10), nullable=False)
+
+    # {"поле": [было, стало], ...}; create — только "стало", delete — только "было"
+    changes: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+    # заголовок X-User клиента (авторизации в API нет)
+    actor: Mapped[str | None] = mapped_column(String(100))
+
+    __table_args__ = (
+        CheckConstraint(f"action IN ('{"', '".join(AUDIT_ACTIONS)}')", name="action_allowed"),
+        # GET /equipment/{id}/audit: история прибора, новые сверху (индекс в каждой партиции)
+        Index("ix_equipment_audit_equipment_changed", "equipment_id", changed_at.desc()),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
+    )
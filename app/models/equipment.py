@@ -2,7 +2,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import CheckConstraint, DateTime, String, func
+from sqlalchemy import CheckConstraint, DateTime, Index, String, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -46,8 +46,10 @@ class Equipment(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, server_default=func.now()
     )
+    # ставит триггер equipment_set_updated_at (BEFORE UPDATE), в т.ч. при изменении
+    # verification — ORM onupdate тут не нужен; индекс — для фильтра updated_since
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
+        DateTime, nullable=False, server_default=func.now(), index=True
     )
 
     verification = relationship(
@@ -64,6 +66,25 @@ class Equipment(Base):
             f"state IN ('{'', ''.join(ALLOWED_STATES)}')",
             name="ck_equipment_state_allowed",
         ),
+        # keyset-пагинация списка: ORDER BY name, id / WHERE (name, id) > (...)
+        Index("ix_equipment_name_id", "name", "id"),
+        # status=годен|срок истекает|срок истек|нет данных — всегда state = 'в работе'
+        Index(
+            "ix_equipment_in_work_name_id",
+            "name",
+            "id",
+            postgresql_where=text("state = 'в работе'"),
+        ),
+        # поиск `q` (ILIKE '%...%') — триграммные GIN-индексы, нужен pg_trgm
+        *(
+            Index(
+                f"ix_equipment_{col}_trgm",
+                col,
+                postgresql_using="gin",
+                postgresql_ops={col: "gin_trgm_ops"},
+            )
+            for col in ("name", "type", "serial_number", "inventory_number")
+        ),
     )
 
     def __repr__(self) -> str:
@@ -0,0 +1,45 @@
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class EquipmentArchive(Base):
+    """
+    Written-off equipment ("списано"), moved out of the hot `equipment` table.
+
+    A row is moved at commit by the deferred trigger equipment_archive_decommissioned
+    when equipment gets state "списано": the equipment row (and its verification,
+    by cascade) is deleted, so the change feed sees a 'delete', and a flat copy
+    with the last verification lands here. Lists read it only with include_archived.
+    """
+
+    __tablename__ = "equipment_archive"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    type: Mapped[str] = mapped_column(String(100), nullable=False)
+    serial_number: Mapped[str] = mapped_column(String(100), nullable=False)
+    inventory_number: Mapped[str] = mapped_column(String(100), nullable=False)
+    state: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now(), index=True
+    )
+
+    # последняя поверка на момент списания (verification удаляется вместе с оборудованием)
+    verification_date: Mapped[date | None] = mapped_column(Date)
+    interval_months: Mapped[int | None] = mapped_column(Integer)
+    next_verification_date: Mapped[date | None] = mapped_column(Date)
+
+    __table_args__ = (
+        # порядок списка (name, id), как ix_equipment_name_id
+        Index("ix_equipment_archive_name_id", "name", "id"),
+    )
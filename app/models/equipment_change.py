@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, CheckConstraint, DateTime, Index, String, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+CHANGE_OPS = ("insert", "update", "delete")
+
+
+class EquipmentChange(Base):
+    """
+    Журнал изменений оборудования для ленты GET /equipment/changes.
+
+    Пишется только триггерами БД (equipment_change_log; правки verification
+    приходят как update оборудования), version — монотонно растёт в порядке
+    коммитов. Строки op='delete' — tombstones для дельта-синхронизации.
+    """
+
+    __tablename__ = "equipment_change"
+
+    version: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    # без FK: запись об удалении переживает саму строку
+    equipment_id: Mapped[str] = mapped_column(UUID(as_uuid=False), nullable=False)
+
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now()
+    )
+
+    __table_args__ = (
+        CheckConstraint(f"op IN ('{"', '".join(CHANGE_OPS)}')", name="op_allowed"),
+        # tombstones: GET /equipment/deleted?since=...
+        Index(
+            "ix_equipment_change_deleted_at",
+            "changed_at",
+            postgresql_where=text("op = 'delete'"),
+        ),
+        # tombstone без более поздних изменений того же id (см. app/changes.tombstones)
+        Index("ix_equipment_change_equipment_version", "equipment_id", "version"),
+    )
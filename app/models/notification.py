@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class NotificationOutbox(Base):
+    """
+    Verifications that became "срок истекает" / "срок истек".
+
+    Written by the daily job (app/notifications.py), one row per (day, kind,
+    equipment type); delivery (mail, messenger) picks rows with sent_at IS NULL.
+    """
+
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    run_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    # expiring | expired
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    equipment_type: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # [{id, name, serial_number, inventory_number, next_verification_date}, ...]
+    items: Mapped[list] = mapped_column(JSONB, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now()
+    )
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint("run_date", "kind", "equipment_type", name="uq_notification_outbox_batch"),
+        Index("ix_notification_outbox_unsent", "id", postgresql_where=text("sent_at IS NULL")),
+    )
+
+
+class JobWatermark(Base):
+    """Last processed day of a background job: scans start from it, not from the whole fleet."""
+
+    __tablename__ = "job_watermark"
+
+    job: Mapped[str] = mapped_column(String(50), primary_key=True)
+    last_run_date: Mapped[date] = mapped_column(Date, nullable=False)
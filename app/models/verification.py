@@ -4,12 +4,17 @@ from __future__ import annotations
 import uuid
 from datetime import date
 
-from sqlalchemy import Date, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Computed, Date, ForeignKey, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
 
+# verification_date + interval_months месяцев - 1 день (все функции IMMUTABLE)
+NEXT_VERIFICATION_DATE_SQL = (
+    "CAST(verification_date + make_interval(0, interval_months) - interval '1 day' AS DATE)"
+)
+
 
 class Verification(Base):
     __tablename__ = "verification"
@@ -30,6 +35,14 @@ class Verification(Base):
     verification_date: Mapped[date] = mapped_column(Date, nullable=False)
     interval_months: Mapped[int] = mapped_column(Integer, nullable=False)
 
+    # дата следующей поверки: хранимая generated-колонка (считается при INSERT/UPDATE),
+    # чтобы фильтры/сортировки по сроку шли по индексу, а не через make_interval на строку
+    next_verification_date: Mapped[date | None] = mapped_column(
+        Date,
+        Computed(NEXT_VERIFICATION_DATE_SQL, persisted=True),
+        index=True,
+    )
+
     equipment = relationship(
         "Equipment",
         back_populates="verification",
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, Index, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class VerificationHistory(Base):
+    """
+    All verifications of an instrument, for audits.
+
+    Filled by the trigger verification_record_history on every INSERT/UPDATE of
+    verification that changes the date or the interval; the `verification` row
+    stays the current one, so list queries do not touch this table.
+    """
+
+    __tablename__ = "verification_history"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    # без FK: история переживает удаление оборудования
+    equipment_id: Mapped[str] = mapped_column(UUID(as_uuid=False), nullable=False)
+
+    verification_date: Mapped[date] = mapped_column(Date, nullable=False)
+    interval_months: Mapped[int] = mapped_column(Integer, nullable=False)
+    next_verification_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now()
+    )
+
+    __table_args__ = (
+        # история по прибору, новые сверху; одна запись на дату поверки
+        Index(
+            "uq_verification_history_equipment_date",
+            "equipment_id",
+            verification_date.column.desc(),
+            unique=True,
+        ),
+    )
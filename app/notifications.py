@@ -0,0 +1,152 @@
+# app/notifications.py
+"""
+Daily job: equipment whose verification crossed into "срок истекает" or
+"срок истек" since the previous run -> notification_outbox, one row per
+(kind, equipment type).
+
+Each run scans only the days elapsed since the watermark, as two ranges over
+ix_verification_next_verification_date:
+
+    expiring: next_verification_date in (W + threshold, D + threshold]
+    expired:  next_verification_date in [W, D - 1]
+
+where W is the last processed day and D is today (CURRENT_DATE). Several
+workers may run the scheduler: the run is guarded by an advisory lock and the
+watermark is moved in the same transaction as the outbox rows.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .db import SessionLocal
+from .models.equipment import Equipment
+from .models.notification import JobWatermark, NotificationOutbox
+from .models.verification import Verification
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "verification_due"
+
+
+async def run_notification_job(db: AsyncSession) -> int | None:
+    """
+    Process the days since the watermark and commit. Returns the number of
+    outbox rows written, or None if another worker holds the lock or today is
+    already done.
+    """
+    locked = await db.scalar(select(func.pg_try_advisory_xact_lock(func.hashtext(JOB_NAME))))
+    if not locked:
+        await db.rollback()
+        return None
+
+    today = await db.scalar(select(func.current_date()))
+    watermark = await db.get(JobWatermark, JOB_NAME)
+    # первый запуск — только сегодняшние переходы, без рассылки по всему парку
+    last = watermark.last_run_date if watermark else today - timedelta(days=1)
+    if last >= today:
+        await db.rollback()
+        return None
+
+    threshold = timedelta(days=settings.days_threshold)
+    next_date = Verification.next_verification_date
+    windows = {
+        "expiring": and_(next_date > last + threshold, next_date <= today + threshold),
+        "expired": and_(next_date >= last, next_date < today),
+    }
+
+    batches: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    for kind, window in windows.items():
+        stmt = (
+            select(
+                Equipment.id,
+                Equipment.type,
+                Equipment.name,
+                Equipment.serial_number,
+                Equipment.inventory_number,
+                next_date,
+            )
+            .join(Equipment, Equipment.id == Verification.equipment_id)
+            .where(window, Equipment.state == "в работе")
+            .order_by(next_date, Equipment.name)
+        )
+        for row in (await db.execute(stmt)).all():
+            batches[(kind, row.type)].append(
+                {
+                    "id": str(row.id),
+                    "name": row.name,
+                    "serial_number": row.serial_number,
+                    "inventory_number": row.inventory_number,
+                    "next_verification_date": row.next_verification_date.isoformat(),
+                }
+            )
+
+    if batches:
+        await db.execute(
+            pg_insert(NotificationOutbox).on_conflict_do_nothing(
+                constraint="uq_notification_outbox_batch"
+            ),
+            [
+                {
+                    "run_date": today,
+                    "kind": kind,
+                    "equipment_type": equipment_type,
+                    "item_count": len(items),
+                    "items": items,
+                }
+                for (kind, equipment_type), items in batches.items()
+            ],
+        )
+
+    stmt = pg_insert(JobWatermark).values(job=JOB_NAME, last_run_date=today)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[JobWatermark.job],
+            set_={"last_run_date": stmt.excluded.last_run_date},
+        )
+    )
+    await db.commit()
+    logger.info("%s: %s..%s, %d outbox rows", JOB_NAME, last, today, len(batches))
+    return len(batches)
+
+
+class NotificationScheduler:
+    """Checks every `notify_check_interval` seconds whether today's run is due."""
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="notification-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with SessionLocal() as db:
+                    await run_notification_job(db)
+            except Exception:
+                logger.exception(
+                    "%s failed, retry in %.0fs", JOB_NAME, settings.notify_check_interval
+                )
+            await asyncio.sleep(settings.notify_check_interval)
+
+
+scheduler = NotificationScheduler()
@@ -0,0 +1,95 @@
+# app/profiling.py
+"""
+Per-request profiling: latency by route template and SQL statements per request.
+
+ProfilingMiddleware (pure ASGI, also covers streaming responses) puts a
+RequestStats into a contextvar; the engine events in app/db.py report every
+statement through `record_query()`. Everything ends up in /metrics.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextvars import ContextVar
+
+from .config import settings
+from .metrics import (
+    DB_N_PLUS_ONE,
+    DB_QUERIES_PER_REQUEST,
+    DB_QUERY_SECONDS,
+    DB_SECONDS_PER_REQUEST,
+    HTTP_REQUEST_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"  # 404 и пр.: не плодим метки по сырому пути
+
+
+class RequestStats:
+    __slots__ = ("queries", "seconds", "statements")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+        # текст SQL -> сколько раз выполнен (параметры не важны: так и выглядит N+1)
+        self.statements: dict[str, int] = {}
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def record_query(statement: str, seconds: float) -> None:
+    DB_QUERY_SECONDS.observe(seconds)
+    stats = _request_stats.get()
+    if stats is None:  # фоновые задачи, миграции
+        return
+    stats.queries += 1
+    stats.seconds += seconds
+    stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+class ProfilingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # роутер кладёт сматченный route в тот же scope
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(elapsed, method, route, str(status_code))
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, method, route)
+            DB_SECONDS_PER_REQUEST.observe(stats.seconds, method, route)
+            _check_n_plus_one(stats, method, route)
+
+
+def _check_n_plus_one(stats: RequestStats, method: str, route: str) -> None:
+    repeated = [
+        (n, sql) for sql, n in stats.statements.items() if n >= settings.n_plus_one_threshold
+    ]
+    if not repeated:
+        return
+    DB_N_PLUS_ONE.inc(1.0, method, route)
+    for n, sql in repeated:
+        logger.warning("possible N+1 in %s %s: %d x %s", method, route, n, sql[:500])
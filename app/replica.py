@@ -0,0 +1,129 @@
+# app/replica.py
+"""
+Read-replica routing.
+
+ReplicaMonitor asks the replica for its replay lag every
+`db_replica_check_interval` seconds. `read_session()` returns a replica session
+while the lag is known and within `db_replica_max_lag`, otherwise a primary
+session: no replica configured, replica down, its WAL receiver disconnected
+or too far behind. Writes and the
+re-reads that must see them (create/update responses) always use the primary
+through `get_db`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .db import ReplicaSessionLocal, SessionLocal
+from .metrics import DB_REPLICA_FALLBACK_READS, Gauge
+
+logger = logging.getLogger(__name__)
+
+# 0 — реплика проиграла всё полученное от работающего потока WAL (или это не standby,
+# например вторая БД для теста); NULL — приёмник WAL отключён или не в streaming: равенство
+# receive/replay LSN тогда ничего не значит, реплика может отставать сколько угодно;
+# иначе — возраст последней проигранной транзакции. status виден с pg_read_all_stats
+# (pg_monitor); без этой роли он NULL, и лаг считается только по времени транзакции
+LAG_SQL = text(
+    """
+    WITH receiver AS (SELECT status FROM pg_stat_wal_receiver)
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM receiver) THEN NULL
+        WHEN (SELECT status FROM receiver) <> 'streaming' THEN NULL
+        WHEN (SELECT status FROM receiver) = 'streaming'
+            AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaMonitor:
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+        self.lag: float | None = None  # секунды; None — неизвестно (нет связи)
+
+    @property
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= settings.db_replica_max_lag
+
+    def start(self) -> None:
+        if self._task is None and settings.db_replica_url:
+            self._task = asyncio.create_task(self._run(), name="replica-monitor")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self.lag = None
+
+    async def check(self) -> None:
+        was_usable = self.usable
+        try:
+            # зависшая реплика не должна держать чтение на себе дольше одного интервала
+            async with asyncio.timeout(settings.db_replica_check_interval):
+                async with ReplicaSessionLocal() as db:
+                    lag = await db.scalar(LAG_SQL)
+            self.lag = float(lag) if lag is not None else None
+        except (OSError, TimeoutError, SQLAlchemyError) as e:
+            self.lag = None
+            if was_usable:
+                logger.warning("replica unavailable, reading from primary: %s", e)
+            return
+        if was_usable and not self.usable:
+            logger.warning("replica lag %s s, reading from primary", self.lag)
+        elif self.usable and not was_usable:
+            logger.info("replica lag %.1f s, reading from replica", self.lag)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.db_replica_check_interval)
+
+
+replica = ReplicaMonitor()
+
+Gauge(
+    "metrology_db_replica_lag_seconds",
+    "Replay lag of the read replica (-1 = unknown or no replica)",
+    lambda: replica.lag if replica.lag is not None else -1,
+)
+
+
+def read_session() -> AsyncSession:
+    """Session for read-only work: the replica while it is usable, otherwise the primary."""
+    if replica.usable:
+        return ReplicaSessionLocal()
+    if settings.db_replica_url:
+        DB_REPLICA_FALLBACK_READS.inc()
+    return SessionLocal()
+
+
+def is_replica(db: AsyncSession) -> bool:
+    return bool(db.info.get("replica"))
+
+
+async def may_miss_recent_write(db: AsyncSession, cache) -> bool:
+    """
+    True if `db` reads from the replica and the last invalidation of `cache`
+    may not have been replayed there yet. Such results are served but not cached:
+    a stale cache entry would outlive the replica lag.
+    """
+    if not is_replica(db):
+        return False
+    # лаг проверяется раз в интервал: между проверками он мог вырасти на интервал
+    window = settings.db_replica_max_lag + settings.db_replica_check_interval
+    return time.time() - await cache.changed_at() < window
@@ -1,6 +1,7 @@
 # app/schemas/equipment.py
 from __future__ import annotations
 
+import uuid
 from datetime import date, datetime
 from typing import Literal
 
@@ -35,6 +36,18 @@ class EquipmentUpdate(BaseModel):
     interval_months: int | None = None
 
 
+# максимум элементов в одном batch-запросе
+BATCH_MAX_ITEMS = 500
+
+
+class EquipmentBatchGet(BaseModel):
+    ids: list[uuid.UUID] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class EquipmentBatchUpdate(EquipmentUpdate):
+    id: uuid.UUID
+
+
 class EquipmentRead(BaseModel):
     id: str
     name: str
@@ -58,3 +71,57 @@ class EquipmentRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class BulkRowError(BaseModel):
+    row: int  # номер строки во входном файле (1 — первая строка данных)
+    detail: str
+
+
+class BulkImportResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    error_count: int = 0
+    # первые BULK_MAX_REPORTED_ERRORS ошибок; остальные только в error_count
+    errors: list[BulkRowError] = Field(default_factory=list)
+
+
+class EquipmentTypeStats(BaseModel):
+    total: int
+    by_status: dict[str, int]
+
+
+class EquipmentStats(BaseModel):
+    total: int
+    by_status: dict[str, int]
+    by_type: dict[str, EquipmentTypeStats]
+
+
+class EquipmentChangeRead(BaseModel):
+    version: int
+    id: str  # equipment_id
+    op: Literal["insert", "update", "delete"]
+    changed_at: datetime
+
+
+class EquipmentChangeFeed(BaseModel):
+    # курсор для следующего запроса: since=version
+    version: int
+    changes: list[EquipmentChangeRead]
+
+
+class EquipmentTombstone(BaseModel):
+    id: str
+    deleted_at: datetime
+
+
+class EquipmentAuditRead(BaseModel):
+    id: int
+    changed_at: datetime
+    action: Literal["create", "update", "delete"]
+    # {"поле": [было, стало]}
+    changes: dict[str, list]
+    actor: str | None
+
+    class Config:
+        from_attributes = True
@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 
 from pydantic import BaseModel
 
@@ -10,3 +10,7 @@ class VerificationRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class VerificationHistoryRead(VerificationRead):
+    recorded_at: datetime
@@ -0,0 +1,85 @@
+# app/sqlcompat.py
+"""
+SQL expressions that compile for both PostgreSQL (the central database) and
+SQLite (the local mirror, app/mirror.py), so list/search/status queries are
+written once.
+
+On SQLite "today" is the local date of the workstation, the counterpart of
+CURRENT_DATE in the server's time zone.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import Date, Integer, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+# имена в нижнем регистре: в запросах это функции (так же в документации SQLAlchemy)
+class today(FunctionElement):
+    """today() / today(n): CURRENT_DATE (+ n days)."""
+
+    type = Date()
+    inherit_cache = True
+    name = "today"
+
+
+class days_until(FunctionElement):
+    """days_until(d): whole days from today to date `d` (negative if in the past)."""
+
+    type = Integer()
+    inherit_cache = True
+    name = "days_until"
+
+
+class uuid_text(FunctionElement):
+    """uuid_text(id): canonical text form of a UUID column (8-4-4-4-12)."""
+
+    type = String()
+    inherit_cache = True
+    name = "uuid_text"
+
+
+def _args(element, compiler, **kw) -> list[str]:
+    return [compiler.process(arg, **kw) for arg in element.clauses]
+
+
+@compiles(today)
+def _today(element, compiler, **kw):
+    args = _args(element, compiler, **kw)
+    return f"CURRENT_DATE + {args[0]}" if args else "CURRENT_DATE"
+
+
+@compiles(today, "sqlite")
+def _today_sqlite(element, compiler, **kw):
+    args = _args(element, compiler, **kw)
+    shift = f", {args[0]} || ' days'" if args else ""
+    return f"date('now', 'localtime'{shift})"
+
+
+@compiles(days_until)
+def _days_until(element, compiler, **kw):
+    # date - date в PostgreSQL — integer
+    return f"({_args(element, compiler, **kw)[0]} - CURRENT_DATE)"
+
+
+@compiles(days_until, "sqlite")
+def _days_until_sqlite(element, compiler, **kw):
+    arg = _args(element, compiler, **kw)[0]
+    return f"CAST(julianday({arg}) - julianday('now', 'localtime', 'start of day') AS INTEGER)"
+
+
+@compiles(uuid_text)
+def _uuid_text(element, compiler, **kw):
+    return f"CAST({_args(element, compiler, **kw)[0]} AS VARCHAR)"
+
+
+@compiles(uuid_text, "sqlite")
+def _uuid_text_sqlite(element, compiler, **kw):
+    # SQLAlchemy хранит UUID в SQLite как 32 hex-символа без дефисов
+    arg = _args(element, compiler, **kw)[0]
+    parts = " || '-' || ".join(
+        f"substr({arg}, {start}, {length})"
+        for start, length in ((1, 8), (9, 4), (13, 4), (17, 4), (21, 12))
+    )
+    return f"lower({parts})"
@@ -0,0 +1,122 @@
+# bench/export.py
+"""
+Memory check for the streaming export (GET /equipment/export).
+
+    uv run python -m bench.generate --rows 1000000 --truncate
+    uv run python -m bench.export --pid <API pid> --expect-rows 1000000
+
+Streams the whole register in every requested format and samples the resident
+set size of the API process (/proc/<pid>/status, Linux) while the body is read.
+Reported per format: rows, MB, seconds, rows/s, RSS before the request, peak RSS
+during it and the growth. A growth above --max-rss-growth MB, or fewer rows than
+--expect-rows, exits with code 1. Run the API with a single worker and pass the
+pid of that worker: with --workers N the export runs in one of the children.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+FORMATS = ("csv", "ndjson")
+SAMPLE_INTERVAL = 0.05  # с
+CHUNK = 1 << 16
+
+
+def rss_mb(pid: int) -> float:
+    """Current resident set size of `pid` in MB (VmRSS from /proc)."""
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError(f"no VmRSS for pid {pid}")
+
+
+async def stream_export(client: httpx.AsyncClient, fmt: str, pid: int) -> dict:
+    before = rss_mb(pid)
+    peak = before
+    done = asyncio.Event()
+
+    async def sampler() -> None:
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, rss_mb(pid))
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    sampling = asyncio.create_task(sampler())
+    lines = size = 0
+    started = time.perf_counter()
+    try:
+        async with client.stream("GET", "/equipment/export", params={"format": fmt}) as r:
+            r.raise_for_status()
+            async for chunk in r.aiter_bytes(CHUNK):
+                lines += chunk.count(b"\n")
+                size += len(chunk)
+    finally:
+        done.set()
+        await sampling
+    elapsed = time.perf_counter() - started
+    peak = max(peak, rss_mb(pid))
+
+    rows = lines - 1 if fmt == "csv" else lines  # csv: строка заголовка
+    return {
+        "rows": rows,
+        "mb": size / (1 << 20),
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        "rss_before_mb": before,
+        "rss_peak_mb": peak,
+        "rss_growth_mb": peak - before,
+    }
+
+
+def print_report(results: dict[str, dict]) -> None:
+    columns = ("rows", "MB", "seconds", "rows/s", "RSS MB", "peak MB", "growth MB")
+    print(f"{'format':<8} " + " ".join(f"{c:>10}" for c in columns))
+    for fmt, r in results.items():
+        print(
+            f"{fmt:<8} {r['rows']:>10} {r['mb']:>10.1f} {r['seconds']:>10.1f} "
+            f"{r['rows_per_sec']:>10.0f} {r['rss_before_mb']:>10.1f} "
+            f"{r['rss_peak_mb']:>10.1f} {r['rss_growth_mb']:>10.1f}"
+        )
+
+
+async def run(args: argparse.Namespace) -> int:
+    if not Path(f"/proc/{args.pid}/status").exists():
+        sys.exit(f"no process {args.pid} in /proc (Linux only): pass the API worker pid")
+
+    # таймаут только на соединение: выгрузка 1M строк идёт минутами
+    timeout = httpx.Timeout(30, read=None)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout) as client:
+        results = {fmt: await stream_export(client, fmt, args.pid) for fmt in args.formats}
+    print_report(results)
+
+    failed = False
+    for fmt, r in results.items():
+        if r["rss_growth_mb"] > args.max_rss_growth:
+            print(f"{fmt}: RSS grew by {r['rss_growth_mb']:.1f} MB > {args.max_rss_growth:.0f} MB")
+            failed = True
+        if args.expect_rows and r["rows"] < args.expect_rows:
+            print(f"{fmt}: {r['rows']} rows < expected {args.expect_rows}")
+            failed = True
+    return int(failed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--pid", type=int, required=True, help="API process to sample")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--expect-rows", type=int, help="fail if the export has fewer rows")
+    parser.add_argument(
+        "--max-rss-growth", type=float, default=100.0, help="allowed peak RSS growth, MB"
+    )
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# bench/generate.py
+"""
+Synthetic fleet for benchmarks: N equipment rows (+ verification) loaded with COPY.
+
+    uv run python -m bench.generate --rows 100000 --truncate
+
+Distributions: equipment types are Zipf-like (a few very common gauges, a long
+tail of rare instruments), ~85% of rows are "в работе", ~90% have a verification
+dated within the last three years with a 6..36 month interval, so every status
+(годен / срок истекает / срок истек / нет данных) is represented. The seed makes
+runs reproducible. Use a local database only: --truncate wipes the tables.
+
+By default the COPY runs with the user triggers of equipment and verification
+disabled (ALTER TABLE ... DISABLE TRIGGER USER inside the load transaction: the
+table owner is enough, foreign keys are still checked). A live write would fire
+the verification touch trigger for every row, which sets updated_at = now() and
+logs one equipment_change row per instrument: the generated updated_at spread
+(what `updated_since` and its index are benchmarked on) and an empty change feed
+would both be lost. Written-off rows are then moved to equipment_archive in
+batches, as `python main.py archive` does, which logs their 'delete' like a real
+write-off. --triggers loads through the triggers instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+import psycopg
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+TYPES = (
+    "Манометр",
+    "Термометр",
+    "Весы",
+    "Мультиметр",
+    "Штангенциркуль",
+    "Микрометр",
+    "Динамометр",
+    "Осциллограф",
+    "Гигрометр",
+    "Барометр",
+    "Расходомер",
+    "Газоанализатор",
+    "Тахометр",
+    "Шумомер",
+    "Люксметр",
+    "Мегаомметр",
+    "Частотомер",
+    "Калибратор давления",
+    "Толщиномер",
+    "pH-метр",
+)
+# Zipf-like: вес типа i ~ 1 / (i + 1)
+TYPE_WEIGHTS = tuple(1 / (i + 1) for i in range(len(TYPES)))
+MODELS_PER_TYPE = 12
+
+STATES = ("в работе", "на консервации", "на верификации", "в ремонте", "списано")
+STATE_WEIGHTS = (85, 5, 4, 4, 2)
+
+VERIFICATION_SHARE = 0.9
+INTERVALS = (6, 12, 12, 12, 24, 24, 36)  # месяцы, 12 — самый частый
+HISTORY_DAYS = 3 * 365
+ARCHIVE_BATCH_SIZE = 5000
+# триггеры, которые COPY обходит по умолчанию (лента изменений, touch, архив)
+TRIGGER_TABLES = ("equipment", "verification")
+
+
+def conninfo(url: str | None) -> str:
+    # postgresql+psycopg://... -> postgresql://... (libpq)
+    return (
+        make_url(url or settings.database_url)
+        .set(drivername="postgresql")
+        .render_as_string(hide_password=False)
+    )
+
+
+def equipment_rows(n: int, rnd: random.Random, now: datetime):
+    models = {
+        t: [f"{t[:2].upper()}-{rnd.randint(10, 999)}" for _ in range(MODELS_PER_TYPE)]
+        for t in TYPES
+    }
+    types = rnd.choices(TYPES, TYPE_WEIGHTS, k=n)
+    states = rnd.choices(STATES, STATE_WEIGHTS, k=n)
+    for i, (type_, state) in enumerate(zip(types, states, strict=True)):
+        created = now - timedelta(days=rnd.randint(0, HISTORY_DAYS), seconds=rnd.randint(0, 86399))
+        yield (
+            uuid.UUID(int=rnd.getrandbits(128), version=4),
+            f"{type_} {rnd.choice(models[type_])}",
+            type_,
+            f"SN{rnd.randint(0, 10**9):09d}-{i}",
+            f"ИН-{i + 1:07d}",
+            state,
+            created,
+            created,
+        )
+
+
+def verification_row(equipment_id: uuid.UUID, rnd: random.Random, today: date):
+    return (
+        uuid.UUID(int=rnd.getrandbits(128), version=4),
+        equipment_id,
+        today - timedelta(days=rnd.randint(0, HISTORY_DAYS)),
+        rnd.choice(INTERVALS),
+    )
+
+
+def load(args: argparse.Namespace) -> None:
+    rnd = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    start = time.perf_counter()
+
+    with psycopg.connect(conninfo(args.database_url)) as conn, conn.cursor() as cur:
+        if args.truncate:
+            cur.execute("TRUNCATE equipment, verification, equipment_archive CASCADE")
+        if not args.triggers:
+            # ALTER TABLE транзакционный: при ошибке загрузки триггеры остаются включёнными
+            for table in TRIGGER_TABLES:
+                cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+
+        verifications = []
+        with cur.copy(
+            "COPY equipment (id, name, type, serial_number, inventory_number, state,"
+            " created_at, updated_at) FROM STDIN"
+        ) as copy:
+            for row in equipment_rows(args.rows, rnd, now):
+                copy.write_row(row)
+                if rnd.random() < VERIFICATION_SHARE:
+                    verifications.append(verification_row(row[0], rnd, now.date()))
+
+        with cur.copy(
+            "COPY verification (id, equipment_id, verification_date, interval_months) FROM STDIN"
+        ) as copy:
+            for row in verifications:
+                copy.write_row(row)
+
+        if not args.triggers:
+            for table in TRIGGER_TABLES:
+                cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+        conn.commit()
+        conn.autocommit = True
+
+        archived = 0
+        if not args.triggers:
+            # списанные без триггера остались в equipment — переносим пачками, как main.py archive
+            while moved := cur.execute(
+                "SELECT equipment_archive_move(%s)", (ARCHIVE_BATCH_SIZE,)
+            ).fetchone()[0]:
+                archived += moved
+        # свежая статистика для планировщика — иначе первые прогоны бенчмарка не показательны
+        cur.execute("ANALYZE equipment")
+        cur.execute("ANALYZE verification")
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"loaded {args.rows} equipment + {len(verifications)} verification rows "
+        f"in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s), "
+        f"{archived} written-off rows moved to equipment_archive"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="default: METROLOGY_DATABASE_URL")
+    parser.add_argument("--truncate", action="store_true", help="wipe equipment first")
+    parser.add_argument(
+        "--triggers",
+        action="store_true",
+        help="fire the row triggers like live writes (updated_at = now(), change feed rows)",
+    )
+    load(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# bench/load.py
+"""
+HTTP load harness for the equipment API.
+
+    METROLOGY_CACHE_ENABLED=false uv run python main.py serve   # API без кэшей ответов
+    uv run python -m bench.load --concurrency 16 --duration 20
+    uv run python -m bench.load --save-baseline bench/baselines/local.json
+    uv run python -m bench.load --baseline bench/baselines/local.json --tolerance 15
+
+Every scenario runs for `--duration` seconds with `--concurrency` workers against
+a running API (fill it with bench.generate first). Start the API with
+METROLOGY_CACHE_ENABLED=false: otherwise the repeated reads are answered from the
+response caches and the numbers say nothing about the SQL behind them. `deep`
+reads OFFSET pages from the second half of the register, `cursor` reads keyset
+pages at the same depths: their p95 should stay close to `list`. Reported per scenario:
+requests/s, rows/s and latency p50/p95/p99. With --baseline the p95 of each
+scenario is compared to the stored one; a regression above --tolerance percent
+exits with code 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import httpx
+
+SCENARIOS = ("list", "deep", "cursor", "search", "detail", "create", "patch", "delete")
+SEARCH_TERMS = ("мано", "термо", "весы", "SN0", "ИН-00", "метр", "калибр")
+ID_SAMPLE_PAGES = 5
+PAGE = 200
+LIST_LIMIT = 50
+CURSOR_DEPTHS = 20  # стартовых курсоров, равномерно по второй половине реестра
+
+
+class Context:
+    """
+    Shared by the scenarios: a sample of existing ids, rows created by the run,
+    the register size and keyset cursors deep into it.
+    """
+
+    def __init__(self, existing: list[str], total: int, cursors: list[str], seed: int) -> None:
+        self.existing = existing
+        self.total = total
+        self.cursors = cursors
+        self.created: list[str] = []
+        self.rnd = random.Random(seed)
+
+
+# Сценарий: один запрос -> число строк в ответе (для rows/s)
+Scenario = Callable[[httpx.AsyncClient, Context], Awaitable[int]]
+
+
+async def list_page(client: httpx.AsyncClient, ctx: Context) -> int:
+    r = await client.get(
+        "/equipment/", params={"limit": LIST_LIMIT, "offset": ctx.rnd.randint(0, 2000)}
+    )
+    r.raise_for_status()
+    return len(r.json())
+
+
+async def deep_page(client: httpx.AsyncClient, ctx: Context) -> int:
+    offset = ctx.rnd.randint(ctx.total // 2, max(ctx.total // 2, ctx.total - LIST_LIMIT))
+    r = await client.get("/equipment/", params={"limit": LIST_LIMIT, "offset": offset})
+    r.raise_for_status()
+    return len(r.json())
+
+
+async def cursor_page(client: httpx.AsyncClient, ctx: Context) -> int:
+    r = await client.get(
+        "/equipment/", params={"limit": LIST_LIMIT, "cursor": ctx.rnd.choice(ctx.cursors)}
+    )
+    r.raise_for_status()
+    return len(r.json())
+
+
+async def search(client: httpx.AsyncClient, ctx: Context) -> int:
+    r = await client.get("/equipment/", params={"q": ctx.rnd.choice(SEARCH_TERMS), "limit": 50})
+    r.raise_for_status()
+    return len(r.json())
+
+
+async def detail(client: httpx.AsyncClient, ctx: Context) -> int:
+    r = await client.get(f"/equipment/{ctx.rnd.choice(ctx.existing)}")
+    r.raise_for_status()
+    return 1
+
+
+async def create(client: httpx.AsyncClient, ctx: Context) -> int:
+    tag = uuid.uuid4().hex[:12]
+    r = await client.post(
+        "/equipment/",
+        json={
+            "name": f"Бенчмарк {tag}",
+            "type": "Бенчмарк",
+            "serial_number": f"BENCH-{tag}",
+            "inventory_number": f"BENCH-{tag}",
+            "verification_date": "2025-01-15",
+            "interval_months": 12,
+        },
+    )
+    r.raise_for_status()
+    ctx.created.append(r.json()["id"])
+    return 1
+
+
+async def patch(client: httpx.AsyncClient, ctx: Context) -> int:
+    # правим только созданное прогоном (у него есть поверка); если нет — создаём
+    if not ctx.created:
+        await create(client, ctx)
+    r = await client.patch(
+        f"/equipment/{ctx.rnd.choice(ctx.created)}",
+        json={"interval_months": ctx.rnd.choice((6, 12, 24))},
+    )
+    r.raise_for_status()
+    return 1
+
+
+async def delete(client: httpx.AsyncClient, ctx: Context) -> int:
+    # удаляем только созданное этим прогоном; когда кончилось — создаём и удаляем
+    if not ctx.created:
+        await create(client, ctx)
+    r = await client.delete(f"/equipment/{ctx.created.pop()}")
+    r.raise_for_status()
+    return 1
+
+
+SCENARIO_FUNCS: dict[str, Scenario] = {
+    "list": list_page,
+    "deep": deep_page,
+    "cursor": cursor_page,
+    "search": search,
+    "detail": detail,
+    "create": create,
+    "patch": patch,
+    "delete": delete,
+}
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, ctx: Context, fn: Scenario, concurrency: int, duration: float
+) -> dict:
+    latencies: list[float] = []
+    rows = errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal rows, errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                n = await fn(client, ctx)  # не `rows += await ...`: гонка между воркерами
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            rows += n
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "rows_per_sec": rows / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def sample_ids(client: httpx.AsyncClient) -> tuple[list[str], int]:
+    """A few pages of ids and the register size."""
+    ids: list[str] = []
+    total = 0
+    for page in range(ID_SAMPLE_PAGES):
+        r = await client.get(
+            "/equipment/", params={"limit": PAGE, "offset": page * PAGE, "count": "estimated"}
+        )
+        r.raise_for_status()
+        ids.extend(item["id"] for item in r.json())
+        total = int(r.headers["X-Total-Count"])
+    if not ids:
+        sys.exit("no equipment rows: run `python -m bench.generate` first")
+    return ids, total
+
+
+async def deep_cursors(client: httpx.AsyncClient, total: int) -> list[str]:
+    """X-Next-Cursor of OFFSET pages spread over the second half of the register."""
+    cursors: list[str] = []
+    for i in range(CURSOR_DEPTHS):
+        offset = total // 2 + i * (total // 2) // CURSOR_DEPTHS
+        r = await client.get("/equipment/", params={"limit": LIST_LIMIT, "offset": offset})
+        r.raise_for_status()
+        if cursor := r.headers.get("X-Next-Cursor"):
+            cursors.append(cursor)
+    if not cursors:
+        # реестр меньше страницы: курсор первой страницы (если он вообще есть)
+        r = await client.get("/equipment/", params={"limit": 1})
+        r.raise_for_status()
+        cursors.append(r.headers.get("X-Next-Cursor", ""))
+    return cursors
+
+
+def print_report(results: dict[str, dict], baseline: dict[str, dict] | None) -> None:
+    columns = ("req/s", "rows/s", "p50 ms", "p95 ms", "p99 ms")
+    header = f"{'scenario':<8} " + " ".join(f"{c:>9}" for c in columns)
+    print(header + ("  p95 vs baseline" if baseline else ""))
+    for name, r in results.items():
+        line = (
+            f"{name:<8} {r['rps']:>9.1f} {r['rows_per_sec']:>9.1f} "
+            f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}"
+        )
+        if baseline and name in baseline:
+            delta = (r["p95_ms"] / baseline[name]["p95_ms"] - 1) * 100
+            line += f"  {delta:+.0f}%"
+        if r["errors"]:
+            line += f"  ({r['errors']} errors)"
+        print(line)
+
+
+def regressions(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    return [
+        name
+        for name, r in results.items()
+        if name in baseline and r["p95_ms"] > baseline[name]["p95_ms"] * (1 + tolerance / 100)
+    ]
+
+
+async def run(args: argparse.Namespace) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        ids, total = await sample_ids(client)
+        cursors = await deep_cursors(client, total) if "cursor" in args.scenarios else []
+        ctx = Context(ids, total, cursors, args.seed)
+        results = {}
+        for name in args.scenarios:
+            results[name] = await run_scenario(
+                client, ctx, SCENARIO_FUNCS[name], args.concurrency, args.duration
+            )
+
+    baseline = json.loads(Path(args.baseline).read_text("utf-8")) if args.baseline else None
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + "\n", "utf-8")
+        print(f"baseline saved to {path}")
+
+    if baseline:
+        failed = regressions(results, baseline, args.tolerance)
+        if failed:
+            print(f"p95 regression > {args.tolerance:.0f}%: {', '.join(failed)}")
+            return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="JSON from a previous --save-baseline run")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed p95 growth, %%")
+    parser.add_argument("--save-baseline", help="write results as a new baseline")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,155 @@
+"""
+Production entry point and worker commands.
+
+    python main.py serve --workers 4   # API: N uvicorn workers on one port
+    python main.py notify              # one run of the verification-due job (cron/timer)
+    python main.py archive             # move written-off equipment to equipment_archive
+
+The API itself runs the same job in the background unless METROLOGY_NOTIFY_ENABLED=false.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import uvicorn
+from sqlalchemy import text
+
+from app.cache import default_cache_path, shared_cache_enabled
+from app.config import settings
+from app.db import SessionLocal, dispose_engine, get_engine, pool_limits
+from app.notifications import run_notification_job
+
+ARCHIVE_BATCH_SIZE = 5000
+
+
+async def notify() -> None:
+    get_engine()
+    try:
+        async with SessionLocal() as db:
+            written = await run_notification_job(db)
+    finally:
+        await dispose_engine()
+    if written is None:
+        print("notify: already done today or running elsewhere")
+    else:
+        print(f"notify: {written} outbox rows")
+
+
+async def archive() -> None:
+    # обычно переносит триггер при COMMIT; команда — для строк, загруженных в обход
+    # триггеров (COPY с DISABLE TRIGGER или в режиме replica)
+    get_engine()
+    moved = 0
+    try:
+        while True:
+            async with SessionLocal() as db:
+                batch = await db.scalar(
+                    text("SELECT equipment_archive_move(:n)"), {"n": ARCHIVE_BATCH_SIZE}
+                )
+                await db.commit()
+            if not batch:
+                break
+            moved += batch
+    finally:
+        await dispose_engine()
+    print(f"archive: {moved} rows moved")
+
+
+def serve(args: argparse.Namespace) -> None:
+    pool_size, max_overflow = pool_limits(args.workers)
+    # воркеры стартуют через spawn и читают настройки заново — передаём через окружение
+    os.environ["METROLOGY_WORKERS"] = str(args.workers)
+
+    cache = "memory" if settings.cache_enabled else "off"
+    private_dirs = []
+    if shared_cache_enabled(args.workers):
+        if settings.cache_path:
+            cache = settings.cache_path
+            # кэш прошлого запуска мог устареть, пока сервер стоял
+            for suffix in ("", "-wal", "-shm"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(cache + suffix)
+        else:
+            # свой каталог 0700 на каждый запуск: чужой процесс не подложит файл кэша
+            cache = default_cache_path()
+            private_dirs.append(os.path.dirname(cache))
+        os.environ["METROLOGY_CACHE_PATH"] = cache
+
+    metrics_dir = settings.metrics_dir
+    if args.workers > 1:
+        if metrics_dir:
+            # снимки прошлого запуска не должны попасть в сумму
+            for path in Path(metrics_dir).glob("*.json"):
+                path.unlink(missing_ok=True)
+        else:
+            metrics_dir = tempfile.mkdtemp(prefix="metrology-metrics-")
+            private_dirs.append(metrics_dir)
+        os.environ["METROLOGY_METRICS_DIR"] = metrics_dir
+
+    loop = "auto"
+    # uvicorn >= 0.36 сам создаёт ProactorEventLoop для одного процесса на Windows,
+    # политику не смотрит — передаём фабрику явно (0.35 и ниже берут цикл из политики)
+    if sys.platform == "win32" and hasattr(uvicorn.config, "LOOP_FACTORIES"):
+        loop = "app.db:selector_event_loop"
+
+    print(
+        f"serve: {args.workers} workers, pool {pool_size}+{max_overflow} per worker, cache {cache}"
+    )
+    # SIGTERM/Ctrl+C: новые соединения не принимаются, активные запросы дорабатывают
+    # до shutdown_timeout, затем lifespan закрывает LISTEN, планировщик и пул
+    uvicorn.run(
+        "app.main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=settings.shutdown_timeout,
+        proxy_headers=args.proxy_headers,
+        loop=loop,
+    )
+    for directory in private_dirs:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
 def main():
-    print("Hello from metrology!")
+    parser = argparse.ArgumentParser(prog="metrology")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("notify", help="run the verification-due notification job once")
+    sub.add_parser("archive", help="move written-off equipment to equipment_archive")
+
+    serve_parser = sub.add_parser("serve", help="run the API with N worker processes")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--workers", type=int, default=settings.workers)
+    serve_parser.add_argument(
+        "--proxy-headers", action="store_true", help="trust X-Forwarded-* from a reverse proxy"
+    )
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        # psycopg в async-режиме не работает на ProactorEventLoop (по умолчанию на Windows)
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    if args.command == "notify":
+        asyncio.run(notify())
+    elif args.command == "archive":
+        asyncio.run(archive())
+    elif args.command == "serve":
+        if args.workers < 1:
+            parser.error("--workers must be >= 1")
+        if settings.mirror_path and args.workers > 1:
+            parser.error("METROLOGY_MIRROR_PATH requires --workers 1")
+        try:
+            pool_limits(args.workers)
+        except ValueError as e:
+            parser.error(str(e))
+        serve(args)
 
 
 if __name__ == "__main__":
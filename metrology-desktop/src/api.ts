@@ -15,8 +15,15 @@ function buildQuery(params: ListParams): string {
     ["type", params.type],
     ["serial_number", params.serial_number],
     ["inventory_number", params.inventory_number],
+    ["status", params.status],
+    ["state", params.state],
+    ["due_before", params.due_before],
+    ["due_after", params.due_after],
+    ["updated_since", params.updated_since],
+    ["sort", params.sort],
     ["limit", params.limit],
     ["offset", params.offset],
+    ["count", params.count],
   ] as const).forEach(([k, v]) => {
     if (v !== undefined && v !== null && String(v).trim() !== "") sp.set(k, String(v));
   });
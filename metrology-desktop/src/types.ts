@@ -32,6 +32,13 @@ export interface ListParams {
   type?: string;
   serial_number?: string;
   inventory_number?: string;
+  status?: string;
+  state?: EquipmentState;
+  due_before?: string;            // YYYY-MM-DD, включительно
+  due_after?: string;             // YYYY-MM-DD, включительно
+  updated_since?: string;         // ISO 8601, включительно (дельта-синхронизация)
+  sort?: "name" | "next_verification_date" | "status";
   limit?: number;
   offset?: number;
+  count?: "none" | "exact" | "estimated"; // итог в заголовке X-Total-Count
 }
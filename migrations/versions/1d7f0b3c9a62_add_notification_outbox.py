@@ -0,0 +1,56 @@
+"""add notification_outbox and job_watermark
+
+Revision ID: 1d7f0b3c9a62
+Revises: c4e1a7b95d30
+Create Date: 2025-09-10 08:54:16.227390
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "1d7f0b3c9a62"
+down_revision: str | Sequence[str] | None = "c4e1a7b95d30"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("run_date", sa.Date(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("equipment_type", sa.String(length=100), nullable=False),
+        sa.Column("item_count", sa.Integer(), nullable=False),
+        sa.Column("items", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_notification_outbox")),
+        sa.UniqueConstraint(
+            "run_date", "kind", "equipment_type", name="uq_notification_outbox_batch"
+        ),
+    )
+    op.create_index(
+        "ix_notification_outbox_unsent",
+        "notification_outbox",
+        ["id"],
+        postgresql_where=sa.text("sent_at IS NULL"),
+    )
+
+    op.create_table(
+        "job_watermark",
+        sa.Column("job", sa.String(length=50), nullable=False),
+        sa.Column("last_run_date", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("job", name=op.f("pk_job_watermark")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_watermark")
+    op.drop_index("ix_notification_outbox_unsent", table_name="notification_outbox")
+    op.drop_table("notification_outbox")
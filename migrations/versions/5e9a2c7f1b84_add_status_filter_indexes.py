@@ -0,0 +1,42 @@
+"""add partial index for status filters on in-work equipment
+
+Revision ID: 5e9a2c7f1b84
+Revises: d81b4e07c9f2
+Create Date: 2025-09-03 09:21:37.660142
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e9a2c7f1b84"
+down_revision: str | Sequence[str] | None = "d81b4e07c9f2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # статусы годен/срок истекает/срок истек/нет данных бывают только у state = 'в работе';
+    # по срокам фильтрует ix_verification_next_verification_date (d81b4e07c9f2)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_equipment_in_work_name_id",
+            "equipment",
+            ["name", "id"],
+            postgresql_where=sa.text("state = 'в работе'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_equipment_in_work_name_id",
+            table_name="equipment",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,91 @@
+"""add verification_history (filled by trigger, backfilled from verification)
+
+Revision ID: 6a8c3e5f2d17
+Revises: 1d7f0b3c9a62
+Create Date: 2025-09-12 15:10:44.581903
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "6a8c3e5f2d17"
+down_revision: str | Sequence[str] | None = "1d7f0b3c9a62"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# AFTER-триггер: generated next_verification_date в NEW уже посчитана.
+# Повторная запись с той же датой (исправили интервал) обновляет строку истории.
+RECORD_HISTORY_FUNCTION = """
+CREATE OR REPLACE FUNCTION verification_record_history() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.verification_date IS NOT DISTINCT FROM OLD.verification_date
+       AND NEW.interval_months IS NOT DISTINCT FROM OLD.interval_months THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO verification_history
+        (equipment_id, verification_date, interval_months, next_verification_date)
+    VALUES
+        (NEW.equipment_id, NEW.verification_date, NEW.interval_months, NEW.next_verification_date)
+    ON CONFLICT (equipment_id, verification_date) DO UPDATE
+        SET interval_months = EXCLUDED.interval_months,
+            next_verification_date = EXCLUDED.next_verification_date,
+            recorded_at = now();
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "verification_history",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("equipment_id", postgresql.UUID(as_uuid=False), nullable=False),
+        sa.Column("verification_date", sa.Date(), nullable=False),
+        sa.Column("interval_months", sa.Integer(), nullable=False),
+        sa.Column("next_verification_date", sa.Date(), nullable=False),
+        sa.Column("recorded_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_verification_history")),
+    )
+    op.create_index(
+        "uq_verification_history_equipment_date",
+        "verification_history",
+        ["equipment_id", sa.text("verification_date DESC")],
+        unique=True,
+    )
+
+    # текущие поверки — первая запись истории
+    op.execute(
+        """
+        INSERT INTO verification_history
+            (equipment_id, verification_date, interval_months, next_verification_date)
+        SELECT equipment_id, verification_date, interval_months, next_verification_date
+        FROM verification
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+    op.execute(RECORD_HISTORY_FUNCTION)
+    op.execute(
+        """
+        CREATE TRIGGER verification_record_history
+        AFTER INSERT OR UPDATE OF verification_date, interval_months ON verification
+        FOR EACH ROW EXECUTE FUNCTION verification_record_history()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS verification_record_history ON verification")
+    op.execute("DROP FUNCTION IF EXISTS verification_record_history()")
+    op.drop_index("uq_verification_history_equipment_date", table_name="verification_history")
+    op.drop_table("verification_history")
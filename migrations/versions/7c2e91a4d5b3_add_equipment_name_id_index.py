@@ -0,0 +1,39 @@
+"""add equipment (name, id) index for keyset pagination
+
+Revision ID: 7c2e91a4d5b3
+Revises: ee8ed682d374
+Create Date: 2025-08-25 10:12:41.318207
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c2e91a4d5b3"
+down_revision: str | Sequence[str] | None = "ee8ed682d374"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY нельзя внутри транзакции — строим индекс вне её
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_equipment_name_id",
+            "equipment",
+            ["name", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_equipment_name_id",
+            table_name="equipment",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,78 @@
+"""add equipment_audit (append-only, partitioned by month)
+
+Revision ID: 8b4d2f6a1c93
+Revises: 6a8c3e5f2d17
+Create Date: 2025-09-15 10:21:37.640158
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "8b4d2f6a1c93"
+down_revision: str | Sequence[str] | None = "6a8c3e5f2d17"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# Партиция месяца создаётся по требованию (вызывает AuditWriter перед записью пачки).
+# Без DEFAULT-партиции: иначе строки попадут туда, и месяц потом не создать.
+# Advisory-lock — на случай, когда партицию одновременно создают несколько воркеров.
+ENSURE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION equipment_audit_ensure_partition(ts timestamp) RETURNS void
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start timestamp := date_trunc('month', ts);
+    part text := 'equipment_audit_' || to_char(month_start, '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext('equipment_audit_partition'));
+    IF to_regclass(part) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF equipment_audit FOR VALUES FROM (%L) TO (%L)',
+            part, month_start, month_start + interval '1 month'
+        );
+    END IF;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "equipment_audit",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        # без FK: аудит переживает удаление оборудования
+        sa.Column("equipment_id", postgresql.UUID(as_uuid=False), nullable=False),
+        sa.Column("action", sa.String(length=10), nullable=False),
+        sa.Column("changes", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("actor", sa.String(length=100), nullable=True),
+        sa.CheckConstraint(
+            "action IN ('create', 'update', 'delete')",
+            name=op.f("ck_equipment_audit_action_allowed"),
+        ),
+        sa.PrimaryKeyConstraint("id", "changed_at", name=op.f("pk_equipment_audit")),
+        postgresql_partition_by="RANGE (changed_at)",
+    )
+    op.create_index(
+        "ix_equipment_audit_equipment_changed",
+        "equipment_audit",
+        ["equipment_id", sa.text("changed_at DESC")],
+    )
+
+    op.execute(ENSURE_PARTITION_FUNCTION)
+    # текущий и следующий месяц — сразу
+    op.execute("SELECT equipment_audit_ensure_partition(localtimestamp)")
+    op.execute("SELECT equipment_audit_ensure_partition(localtimestamp + interval '1 month')")
+
+
+def downgrade() -> None:
+    op.drop_table("equipment_audit")  # вместе с партициями
+    op.execute("DROP FUNCTION IF EXISTS equipment_audit_ensure_partition(timestamp)")
@@ -0,0 +1,85 @@
+"""add equipment_change feed table and triggers
+
+Revision ID: 9f3b6d2e8a15
+Revises: 5e9a2c7f1b84
+Create Date: 2025-09-06 14:02:11.318420
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "9f3b6d2e8a15"
+down_revision: str | Sequence[str] | None = "5e9a2c7f1b84"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# Триггеры отложенные (DEFERRABLE INITIALLY DEFERRED): срабатывают при COMMIT, а
+# advisory-lock держится до его конца — так version растёт в порядке коммитов, и
+# клиент с курсором since=N не пропустит транзакцию, закоммиченную позже с меньшим N.
+# NOTIFY с пустым payload схлопывается в один на транзакцию (и на bulk-импорт).
+CHANGE_LOG_FUNCTION = """
+CREATE OR REPLACE FUNCTION equipment_change_log() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    eq_id uuid;
+    change_op text;
+BEGIN
+    IF TG_TABLE_NAME = 'equipment' THEN
+        change_op := lower(TG_OP);
+        IF TG_OP = 'DELETE' THEN eq_id := OLD.id; ELSE eq_id := NEW.id; END IF;
+    ELSE
+        change_op := 'update';
+        IF TG_OP = 'DELETE' THEN eq_id := OLD.equipment_id; ELSE eq_id := NEW.equipment_id; END IF;
+        -- verification deleted by the equipment cascade: the 'delete' row is enough
+        IF NOT EXISTS (SELECT 1 FROM equipment WHERE id = eq_id) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('equipment_change'));
+    INSERT INTO equipment_change (equipment_id, op) VALUES (eq_id, change_op);
+    PERFORM pg_notify('equipment_changes', '');
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "equipment_change",
+        sa.Column("version", sa.BigInteger(), autoincrement=True, nullable=False),
+        # без FK: запись об удалении переживает саму строку
+        sa.Column("equipment_id", postgresql.UUID(as_uuid=False), nullable=False),
+        sa.Column("op", sa.String(length=10), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.CheckConstraint(
+            "op IN ('insert', 'update', 'delete')",
+            name=op.f("ck_equipment_change_op_allowed"),
+        ),
+        sa.PrimaryKeyConstraint("version", name=op.f("pk_equipment_change")),
+    )
+
+    op.execute(CHANGE_LOG_FUNCTION)
+    for table in ("equipment", "verification"):
+        op.execute(
+            f"""
+            CREATE CONSTRAINT TRIGGER {table}_change_log
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION equipment_change_log()
+            """
+        )
+
+
+def downgrade() -> None:
+    for table in ("verification", "equipment"):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_change_log ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS equipment_change_log()")
+    op.drop_table("equipment_change")
@@ -0,0 +1,48 @@
+"""add pg_trgm GIN indexes for equipment search
+
+Revision ID: a3f0d6c81e27
+Revises: 7c2e91a4d5b3
+Create Date: 2025-08-27 14:03:19.552804
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f0d6c81e27"
+down_revision: str | Sequence[str] | None = "7c2e91a4d5b3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+SEARCH_COLUMNS = ("name", "type", "serial_number", "inventory_number")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY нельзя внутри транзакции — строим индексы вне её
+    with op.get_context().autocommit_block():
+        for col in SEARCH_COLUMNS:
+            op.create_index(
+                f"ix_equipment_{col}_trgm",
+                "equipment",
+                [col],
+                postgresql_using="gin",
+                postgresql_ops={col: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for col in reversed(SEARCH_COLUMNS):
+            op.drop_index(
+                f"ix_equipment_{col}_trgm",
+                table_name="equipment",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+    # расширение не удаляем: им могут пользоваться другие объекты БД
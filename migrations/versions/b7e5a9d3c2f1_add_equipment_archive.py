@@ -0,0 +1,153 @@
+"""add equipment_archive for written-off equipment, move existing rows in batches
+
+Revision ID: b7e5a9d3c2f1
+Revises: 8b4d2f6a1c93
+Create Date: 2025-09-18 16:47:05.912734
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e5a9d3c2f1"
+down_revision: str | Sequence[str] | None = "8b4d2f6a1c93"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+MOVE_BATCH_SIZE = 5000
+
+ARCHIVE_COLUMNS = (
+    "id, name, type, serial_number, inventory_number, state, created_at, updated_at,"
+    " verification_date, interval_months, next_verification_date"
+)
+
+# Повторное списание того же id (строку вернули из архива вручную) — перезаписываем.
+ARCHIVE_INSERT = f"""
+    INSERT INTO equipment_archive ({ARCHIVE_COLUMNS})
+    SELECT m.id, m.name, m.type, m.serial_number, m.inventory_number, m.state,
+           m.created_at, m.updated_at,
+           v.verification_date, v.interval_months, v.next_verification_date
+    FROM moved m
+    LEFT JOIN verification v ON v.equipment_id = m.id
+    ON CONFLICT (id) DO UPDATE SET
+        name = excluded.name, type = excluded.type,
+        serial_number = excluded.serial_number, inventory_number = excluded.inventory_number,
+        state = excluded.state, created_at = excluded.created_at,
+        updated_at = excluded.updated_at, archived_at = now(),
+        verification_date = excluded.verification_date,
+        interval_months = excluded.interval_months,
+        next_verification_date = excluded.next_verification_date
+"""
+
+# Триггер отложенный (DEFERRABLE INITIALLY DEFERRED): строка переносится при COMMIT,
+# поэтому PATCH state + поверка в одной транзакции попадают в архив целиком, а
+# state, вернувшийся к другому значению до коммита, ничего не переносит (повторная
+# проверка state). verification удаляется каскадом (verification_history остаётся),
+# лента изменений получает 'delete' — клиенты убирают строку из горячего списка.
+ARCHIVE_TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION equipment_archive_decommissioned() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH moved AS (
+        DELETE FROM equipment WHERE id = NEW.id AND state = 'списано' RETURNING *
+    )
+    {ARCHIVE_INSERT};
+    RETURN NULL;
+END
+$$
+"""
+
+# Пачка для переноса существующих строк (и `python main.py archive` после загрузки
+# с отключёнными триггерами). SKIP LOCKED — не ждём строк, которые сейчас правят.
+# Все части CTE видят один снимок: verification ещё на месте для LEFT JOIN.
+ARCHIVE_MOVE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION equipment_archive_move(batch_size integer) RETURNS integer
+LANGUAGE sql AS $$
+    WITH batch AS (
+        SELECT id FROM equipment WHERE state = 'списано'
+        LIMIT batch_size FOR UPDATE SKIP LOCKED
+    ), moved AS (
+        DELETE FROM equipment e USING batch b WHERE e.id = b.id RETURNING e.*
+    ), archived AS (
+        {ARCHIVE_INSERT}
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM archived
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "equipment_archive",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("type", sa.String(length=100), nullable=False),
+        sa.Column("serial_number", sa.String(length=100), nullable=False),
+        sa.Column("inventory_number", sa.String(length=100), nullable=False),
+        sa.Column("state", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("verification_date", sa.Date(), nullable=True),
+        sa.Column("interval_months", sa.Integer(), nullable=True),
+        sa.Column("next_verification_date", sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_equipment_archive")),
+    )
+    op.create_index(op.f("ix_equipment_archive_archived_at"), "equipment_archive", ["archived_at"])
+    op.create_index("ix_equipment_archive_name_id", "equipment_archive", ["name", "id"])
+
+    op.execute(ARCHIVE_TRIGGER_FUNCTION)
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER equipment_archive_decommissioned
+        AFTER INSERT OR UPDATE OF state ON equipment
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW WHEN (NEW.state = 'списано')
+        EXECUTE FUNCTION equipment_archive_decommissioned()
+        """
+    )
+    op.execute(ARCHIVE_MOVE_FUNCTION)
+
+    # Перенос существующих строк онлайн: каждая пачка — своя короткая транзакция,
+    # блокировки держатся только на её строках. Новые списания с этого момента
+    # переносит триггер.
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        while bind.scalar(sa.text("SELECT equipment_archive_move(:n)"), {"n": MOVE_BATCH_SIZE}):
+            pass
+    op.execute("ANALYZE equipment")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS equipment_archive_decommissioned ON equipment")
+    op.execute("DROP FUNCTION IF EXISTS equipment_archive_decommissioned()")
+    op.execute("DROP FUNCTION IF EXISTS equipment_archive_move(integer)")
+
+    # обратно в горячую таблицу (next_verification_date — вычисляемая колонка)
+    op.execute(
+        """
+        INSERT INTO equipment
+            (id, name, type, serial_number, inventory_number, state, created_at, updated_at)
+        SELECT id, name, type, serial_number, inventory_number, state, created_at, updated_at
+        FROM equipment_archive
+        ON CONFLICT (id) DO NOTHING
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO verification (id, equipment_id, verification_date, interval_months)
+        SELECT gen_random_uuid(), id, verification_date, interval_months
+        FROM equipment_archive
+        WHERE verification_date IS NOT NULL AND interval_months IS NOT NULL
+        ON CONFLICT (equipment_id) DO NOTHING
+        """
+    )
+    op.drop_index("ix_equipment_archive_name_id", table_name="equipment_archive")
+    op.drop_index(op.f("ix_equipment_archive_archived_at"), table_name="equipment_archive")
+    op.drop_table("equipment_archive")
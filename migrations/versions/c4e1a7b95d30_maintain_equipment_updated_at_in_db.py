@@ -0,0 +1,120 @@
+"""maintain equipment.updated_at with triggers; indexes for delta sync
+
+Revision ID: c4e1a7b95d30
+Revises: 9f3b6d2e8a15
+Create Date: 2025-09-08 11:37:52.904117
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e1a7b95d30"
+down_revision: str | Sequence[str] | None = "9f3b6d2e8a15"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# updated_at = now() при любом реальном изменении строки (no-op UPDATE не считается)
+SET_UPDATED_AT_FUNCTION = """
+CREATE OR REPLACE FUNCTION equipment_set_updated_at() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF ROW(NEW.*) IS DISTINCT FROM ROW(OLD.*) THEN
+        NEW.updated_at := now();
+    END IF;
+    RETURN NEW;
+END
+$$
+"""
+
+# правка поверки = изменение оборудования: UPDATE equipment ставит updated_at (триггер
+# выше) и пишет 'update' в equipment_change (equipment_change_log)
+TOUCH_EQUIPMENT_FUNCTION = """
+CREATE OR REPLACE FUNCTION verification_touch_equipment() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND ROW(NEW.*) IS NOT DISTINCT FROM ROW(OLD.*) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE equipment SET updated_at = now() WHERE id = OLD.equipment_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.equipment_id IS DISTINCT FROM OLD.equipment_id THEN
+        UPDATE equipment SET updated_at = now() WHERE id = NEW.equipment_id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute(SET_UPDATED_AT_FUNCTION)
+    op.execute(
+        """
+        CREATE TRIGGER equipment_set_updated_at
+        BEFORE UPDATE ON equipment
+        FOR EACH ROW EXECUTE FUNCTION equipment_set_updated_at()
+        """
+    )
+
+    op.execute(TOUCH_EQUIPMENT_FUNCTION)
+    op.execute(
+        """
+        CREATE TRIGGER verification_touch_equipment
+        AFTER INSERT OR UPDATE OR DELETE ON verification
+        FOR EACH ROW EXECUTE FUNCTION verification_touch_equipment()
+        """
+    )
+    # изменения verification теперь приходят в ленту через UPDATE equipment
+    op.execute("DROP TRIGGER IF EXISTS verification_change_log ON verification")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_equipment_updated_at",
+            "equipment",
+            ["updated_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_equipment_change_deleted_at",
+            "equipment_change",
+            ["changed_at"],
+            postgresql_where=sa.text("op = 'delete'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_equipment_change_deleted_at",
+            table_name="equipment_change",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_equipment_updated_at",
+            table_name="equipment",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER verification_change_log
+        AFTER INSERT OR UPDATE OR DELETE ON verification
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION equipment_change_log()
+        """
+    )
+    op.execute("DROP TRIGGER IF EXISTS verification_touch_equipment ON verification")
+    op.execute("DROP FUNCTION IF EXISTS verification_touch_equipment()")
+    op.execute("DROP TRIGGER IF EXISTS equipment_set_updated_at ON equipment")
+    op.execute("DROP FUNCTION IF EXISTS equipment_set_updated_at()")
@@ -0,0 +1,40 @@
+"""add (equipment_id, version) index on equipment_change for tombstones
+
+Revision ID: d5a8c2e4f7b9
+Revises: b7e5a9d3c2f1
+Create Date: 2025-09-22 11:38:52.204617
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a8c2e4f7b9"
+down_revision: str | Sequence[str] | None = "b7e5a9d3c2f1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # tombstone действует, только если после него нет других изменений id (строку могли
+    # вернуть из equipment_archive) — NOT EXISTS по этому индексу
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_equipment_change_equipment_version",
+            "equipment_change",
+            ["equipment_id", "version"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_equipment_change_equipment_version",
+            table_name="equipment_change",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,54 @@
+"""add stored verification.next_verification_date
+
+Revision ID: d81b4e07c9f2
+Revises: a3f0d6c81e27
+Create Date: 2025-09-01 11:47:05.904117
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d81b4e07c9f2"
+down_revision: str | Sequence[str] | None = "a3f0d6c81e27"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "verification",
+        sa.Column(
+            "next_verification_date",
+            sa.Date(),
+            sa.Computed(
+                "CAST(verification_date + make_interval(0, interval_months)"
+                " - interval '1 day' AS DATE)",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_verification_next_verification_date"),
+            "verification",
+            ["next_verification_date"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f("ix_verification_next_verification_date"),
+            table_name="verification",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("verification", "next_verification_date")
@@ -0,0 +1,67 @@
+"""verification_touch_equipment: skip equipment already changed in this transaction
+
+Revision ID: e2b7d4f9a6c3
+Revises: d5a8c2e4f7b9
+Create Date: 2025-09-23 09:14:06.571382
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b7d4f9a6c3"
+down_revision: str | Sequence[str] | None = "d5a8c2e4f7b9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# updated_at = now() у строки, вставленной или изменённой этой же транзакцией (создание
+# с поверкой, bulk-импорт, PATCH оборудования + поверки): лишний UPDATE дал бы ещё одну
+# версию кортежа и ещё одну строку 'update' в equipment_change — пропускаем его
+TOUCH_EQUIPMENT_FUNCTION = """
+CREATE OR REPLACE FUNCTION verification_touch_equipment() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND ROW(NEW.*) IS NOT DISTINCT FROM ROW(OLD.*) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE equipment SET updated_at = now()
+        WHERE id = OLD.equipment_id AND updated_at IS DISTINCT FROM now();
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.equipment_id IS DISTINCT FROM OLD.equipment_id THEN
+        UPDATE equipment SET updated_at = now()
+        WHERE id = NEW.equipment_id AND updated_at IS DISTINCT FROM now();
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+PREVIOUS_TOUCH_EQUIPMENT_FUNCTION = """
+CREATE OR REPLACE FUNCTION verification_touch_equipment() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND ROW(NEW.*) IS NOT DISTINCT FROM ROW(OLD.*) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE equipment SET updated_at = now() WHERE id = OLD.equipment_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.equipment_id IS DISTINCT FROM OLD.equipment_id THEN
+        UPDATE equipment SET updated_at = now() WHERE id = NEW.equipment_id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute(TOUCH_EQUIPMENT_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_TOUCH_EQUIPMENT_FUNCTION)